@@ -2,11 +2,11 @@ import customtkinter
 from PIL import Image
 import os
 from CTkToolTip import *
-from CTkTable import *
 import time
+from collections import OrderedDict
 from tkinter import filedialog
 
-from backend import downloads_dir, log
+from backend import downloads_dir, log, task_executor
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -14,9 +14,68 @@ button_fg_color_light = "#dbdbdb"
 button_hover_color_light = "#c4c4c4"
 button_fg_color_dark = "#2b2b2b"
 button_hover_color_dark = "#232323"
+
+frame_cache_size = 4 # Built frames kept hidden for instant switching, least recently shown are destroyed
+log_frame_switch_times = False # Write the switch latency of every frame to the log, for profiling
+preload_button_icons = True # Decode all "imgs/button_icons" at startup instead of on first use
 ### light icon color (206, 206, 206)
 ### dark icon color (43, 43, 43)
 
+class IconCache:
+    """
+    Icons shared by the whole process, each PNG decoded once.
+
+    Decoded images are kept by (directory, name) and `CTkImage` objects by (directory, light
+    icon, dark icon, size). A `CTkImage` holds both theme variants and keeps its scaled copies,
+    so widgets sharing it don't repeat the decoding or the scaling when frames are built.
+    """
+    def __init__(self):
+        self.images = {}
+        self.ctk_images = {}
+
+    def get_image(self, icons_directory, name):
+        """Returns the decoded PNG icon, None if the file does not exist"""
+        key = (icons_directory, name)
+
+        if key not in self.images:
+            path = os.path.join(base_dir, "imgs", icons_directory, f"{name}.png")
+            if not os.path.exists(path):
+                return None
+
+            image = Image.open(path)
+            image.load()
+            self.images[key] = image
+
+        return self.images[key]
+
+    def get_ctk_image(self, icons_directory, light_icon_name, dark_icon_name, icon_size):
+        """Returns a shared `CTkImage`; the dark icon is shown in light mode and vice versa"""
+        key = (icons_directory, light_icon_name, dark_icon_name, icon_size)
+
+        if key not in self.ctk_images:
+            light_icon = self.get_image(icons_directory, light_icon_name)
+            dark_icon = self.get_image(icons_directory, dark_icon_name)
+            if light_icon is None or dark_icon is None:
+                return None
+
+            self.ctk_images[key] = customtkinter.CTkImage(light_image=dark_icon, dark_image=light_icon, size=(icon_size, icon_size))
+
+        return self.ctk_images[key]
+
+    def preload(self, icons_directory):
+        """Decodes all PNG icons of a directory in "imgs" """
+        directory_path = os.path.join(base_dir, "imgs", icons_directory)
+
+        try:
+            names = sorted(os.path.splitext(entry)[0] for entry in os.listdir(directory_path) if entry.endswith(".png"))
+            for name in names:
+                self.get_image(icons_directory, name)
+        except Exception:
+            log.write_debug()
+            log.write_log(f"Error occured while loading icons from '{icons_directory}'")
+
+icon_cache = IconCache()
+
 class Button(customtkinter.CTkButton):
     def __init__(self,
                  master=None,
@@ -78,22 +137,177 @@ class Button(customtkinter.CTkButton):
             log.write_debug("Both light and dark icons must be provided together, or none at all")
             return None  
 
-        light_icon_path = os.path.join(base_dir, "imgs", "button_icons", f"{light_icon_name}.png")
-        dark_icon_path = os.path.join(base_dir, "imgs", "button_icons", f"{dark_icon_name}.png")
-
-        if not os.path.exists(light_icon_path):
+        if icon_cache.get_image("button_icons", light_icon_name) is None:
             log.write_debug(f"The button icon file '{light_icon_name}' does not exist")
             return None
-        elif not os.path.exists(dark_icon_path):
+        elif icon_cache.get_image("button_icons", dark_icon_name) is None:
             log.write_debug(f"The button icon file '{dark_icon_name}' does not exist")
             return None       
-        
 
-        light_icon = Image.open(light_icon_path)
-        dark_icon = Image.open(dark_icon_path)
-        icon_image = customtkinter.CTkImage(light_image=dark_icon, dark_image=light_icon, size=(icon_size, icon_size))
+        return icon_cache.get_ctk_image("button_icons", light_icon_name, dark_icon_name, icon_size)
+
+class VirtualFileTable(customtkinter.CTkFrame):
+    """
+    Table of files which creates widgets only for the visible rows.
+
+    Rows are pulled in pages from `load_page(offset, limit)` when they scroll into view and
+    only the last `max_cached_pages` pages are kept. Scrolling reuses the same row widgets
+    and only changes their texts, so opening the table and scrolling through it cost the
+    same for 100 and for 100k files.
+    """
+    def __init__(self,
+                 master,
+                 columns,
+                 load_page,
+                 page_size=100,
+                 max_cached_pages=10,
+                 row_height=28,
+                 font=None,
+                 **kwargs):
+        super().__init__(master, **kwargs)
+
+        self.columns = columns  # (record key, header text, relative width)
+        self.load_page = load_page
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self.row_height = row_height
+        self.font = font
+
+        self.row_count = 0
+        self.first_row = 0
+        self.pages = OrderedDict()
+        self.row_labels = []
+        self.row_texts = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        header_frame = customtkinter.CTkFrame(self, fg_color="transparent")
+        header_frame.grid(row=0, column=0, sticky="ew")
+
+        self.body_frame = customtkinter.CTkFrame(self, fg_color="transparent")
+        self.body_frame.grid(row=1, column=0, sticky="nsew")
+        self.body_frame.grid_propagate(False)
+
+        for index, (_, header_text, weight) in enumerate(columns):
+            for column_frame in (header_frame, self.body_frame):
+                column_frame.grid_columnconfigure(index, weight=weight, uniform="column")
+
+            customtkinter.CTkLabel(header_frame,
+                                   text=header_text,
+                                   font=font,
+                                   anchor="w").grid(row=0, column=index, sticky="ew", padx=5)
+
+        self.scrollbar = customtkinter.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+
+        self.body_frame.bind("<Configure>", self.on_resize)
+        self.bind_mouse_wheel(self.body_frame)
+
+    def bind_mouse_wheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_mouse_wheel)
+        widget.bind("<Button-4>", self.on_mouse_wheel)
+        widget.bind("<Button-5>", self.on_mouse_wheel)
+
+    def set_row_count(self, row_count, scroll_to_top=False):
+        """Sets the number of rows and drops loaded pages, e.g. after the files have changed"""
+        self.row_count = row_count
+        self.pages.clear()
+        self.scroll_to(0 if scroll_to_top else self.first_row, force=True)
+
+    def on_resize(self, event):
+        visible_rows = max(1, event.height // self.row_height)
+
+        while len(self.row_labels) < visible_rows:
+            row = len(self.row_labels)
+            labels = []
+
+            for column, _ in enumerate(self.columns):
+                label = customtkinter.CTkLabel(self.body_frame,
+                                               text="",
+                                               height=self.row_height,
+                                               font=self.font,
+                                               anchor="w")
+                label.grid(row=row, column=column, sticky="ew", padx=5)
+                self.bind_mouse_wheel(label)
+                labels.append(label)
+
+            self.row_labels.append(labels)
+            self.row_texts.append([""] * len(self.columns))
+
+        while len(self.row_labels) > visible_rows:
+            for label in self.row_labels.pop():
+                label.destroy()
+            self.row_texts.pop()
+
+        self.scroll_to(self.first_row, force=True)
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.row_count))
+        elif args[0] == "scroll":
+            step = len(self.row_labels) if args[2] == "pages" else 1
+            self.scroll_to(self.first_row + int(args[1]) * step)
+
+    def on_mouse_wheel(self, event):
+        if event.num == 4:
+            rows = -3
+        elif event.num == 5:
+            rows = 3
+        else:
+            rows = -3 if event.delta > 0 else 3
+
+        self.scroll_to(self.first_row + rows)
+
+    def scroll_to(self, first_row, force=False):
+        first_row = max(0, min(first_row, self.row_count - len(self.row_labels)))
+
+        if first_row != self.first_row or force:
+            self.first_row = first_row
+            self.render()
+
+    def render(self):
+        for offset, (labels, texts) in enumerate(zip(self.row_labels, self.row_texts)):
+            index = self.first_row + offset
+            record = self.get_record(index) if index < self.row_count else None
+
+            for column, (key, _, _) in enumerate(self.columns):
+                if index >= self.row_count:
+                    text = ""
+                elif record is None:
+                    text = "..."
+                else:
+                    text = str(record[key])
+
+                # Tk redraws only the labels whose text really changes
+                if texts[column] != text:
+                    labels[column].configure(text=text)
+                    texts[column] = text
+
+        # The next screen is loaded before it is scrolled to
+        next_row = self.first_row + 2 * len(self.row_labels)
+        if next_row < self.row_count:
+            self.get_record(next_row)
+
+        if self.row_count:
+            self.scrollbar.set(self.first_row / self.row_count,
+                               min(1, (self.first_row + len(self.row_labels)) / self.row_count))
+        else:
+            self.scrollbar.set(0, 1)
 
-        return icon_image
+    def get_record(self, index):
+        page, position = divmod(index, self.page_size)
+        records = self.pages.get(page)
+
+        if records is None:
+            records = self.load_page(page * self.page_size, self.page_size) or []
+            self.pages[page] = records
+
+            while len(self.pages) > self.max_cached_pages:
+                self.pages.popitem(last=False)
+
+        self.pages.move_to_end(page)
+        return records[position] if position < len(records) else None
 
 class App(customtkinter.CTk):
     def __init__(self):
@@ -116,6 +330,9 @@ class App(customtkinter.CTk):
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
+        if preload_button_icons:
+            icon_cache.preload("button_icons")
+
         ### MENU FRAME SETUP ###
         self.frame_menu = customtkinter.CTkFrame(self, width=80)
         self.frame_menu.grid(row=0, column=0, sticky="ns", padx=10, pady=10)
@@ -134,6 +351,15 @@ class App(customtkinter.CTk):
         self.current_frame = None
         self.current_frame_name = None
         self.after_id = None
+        self.frames = OrderedDict()
+        self.frame_switch_times = {}
+
+        ### BACKGROUND TASKS SETUP ###
+        self.task_executor = task_executor.TaskExecutor()
+        self.tasks_after_id = None
+        self.task_group = None
+        self.poll_tasks()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.show_frame("downloads")
 
@@ -193,7 +419,7 @@ class App(customtkinter.CTk):
         time_label = customtkinter.CTkLabel(frame, 
                                             font=self.content_frame_font_medium)
         time_label.pack(pady=10)
-        self.update_time(time_label)
+        frame.on_show = lambda: self.update_time(time_label)
         
         self.horizontal_separator(frame)
 
@@ -231,8 +457,9 @@ class App(customtkinter.CTk):
                                                                   height=50)
         current_download_directory_frame.pack(fill="x", padx=30, pady=10)
 
-        dir = downloads_dir.get_path_to_downloads_directory() if downloads_dir.get_path_to_downloads_directory() is not None else "-"
-        current_directory_path = customtkinter.StringVar(value=dir)
+        current_directory_path = customtkinter.StringVar(value="...")
+        self.run_in_background(downloads_dir.get_path_to_downloads_directory,
+                               on_done=lambda path: current_directory_path.set(path if path is not None else "-"))
 
         dir_label = customtkinter.CTkLabel(current_download_directory_frame,
                                            text="Downloads directory:",
@@ -277,21 +504,73 @@ class App(customtkinter.CTk):
                                                       fg_color="transparent")
         action_buttons_frame.pack(side="right", fill="both", padx=0, pady=0)
 
-        value = [[1,2,3,4],
-                [1,2,3,4],
-                [1,2,3,4],
-                [1,2,3,4],
-                [1,2,3,4]]
-
-        table = CTkTable(master=scrollable_files_frame,
-                         row=5,
-                         column=4,
-                         values=value,
-                         width=50,
-                         colors=["black", "grey"],
-                         header_color="red",
-                         corner_radius=0)
-        table.pack(fill="both", expand=True, padx=5, pady=5)
+        listing_tools_frame = customtkinter.CTkFrame(scrollable_files_frame,
+                                                     fg_color="transparent")
+        listing_tools_frame.pack(fill="x", padx=5, pady=(5, 0))
+
+        search_entry = customtkinter.CTkEntry(listing_tools_frame,
+                                              placeholder_text="Search files...",
+                                              font=self.content_frame_font_mini)
+        search_entry.pack(side="left", fill="x", expand=True)
+
+        sort_columns = {"Name": "name", "Size": "size", "Date": "date", "Type": "suffix"}
+        sort_column = customtkinter.StringVar(value="Name")
+        descending = customtkinter.BooleanVar(value=False)
+
+        # Files are sorted and searched in memory; pages are read from the current result
+        listing = {"result": None, "loaded": False}
+
+        files_table = VirtualFileTable(scrollable_files_frame,
+                                       columns=[("name", "Name", 4),
+                                                ("suffix", "Type", 1),
+                                                ("size", "Size", 1),
+                                                ("creation_date", "Created", 2)],
+                                       load_page=lambda offset, limit: listing["result"].get_page(offset, limit) if listing["result"] else [],
+                                       font=self.content_frame_font_mini)
+        files_table.pack(fill="both", expand=True, padx=5, pady=5)
+
+        def update_listing(*_):
+            if not listing["loaded"]:
+                return  # The index is still being loaded in the background
+
+            listing["result"] = downloads_dir.query_indexed_files(search_entry.get(),
+                                                                  sort_columns[sort_column.get()],
+                                                                  descending.get())
+            files_table.set_row_count(len(listing["result"]) if listing["result"] else 0, scroll_to_top=True)
+
+        def load_listing_index():
+            downloads_dir.sync_downloads_index()
+            return downloads_dir.get_listing_index()
+
+        def on_listing_index_loaded(listing_index):
+            listing["loaded"] = listing_index is not None
+            update_listing()
+
+        descending_checkbox = customtkinter.CTkCheckBox(listing_tools_frame,
+                                                        text="Descending",
+                                                        variable=descending,
+                                                        command=update_listing,
+                                                        font=self.content_frame_font_mini)
+        descending_checkbox.pack(side="right", padx=(10, 0))
+
+        sort_menu = customtkinter.CTkOptionMenu(listing_tools_frame,
+                                                values=list(sort_columns),
+                                                variable=sort_column,
+                                                command=update_listing,
+                                                width=100,
+                                                font=self.content_frame_font_mini)
+        sort_menu.pack(side="right", padx=(10, 0))
+
+        search_entry.bind("<KeyRelease>", update_listing)
+
+        def refresh():
+            listing["loaded"] = False
+            self.run_in_background(downloads_dir.get_path_to_downloads_directory,
+                                   on_done=lambda path: current_directory_path.set(path if path is not None else "-"))
+            self.run_in_background(load_listing_index, on_done=on_listing_index_loaded)
+
+        frame.on_refresh = refresh
+        self.run_in_background(load_listing_index, on_done=on_listing_index_loaded)
 
 
         return frame
@@ -325,15 +604,11 @@ class App(customtkinter.CTk):
         return frame
 
     def show_frame(self, name):
+        """Shows a frame, built on first use and kept hidden afterwards (see `frame_cache_size`)"""
         if self.current_frame_name == name:
             return  
 
-        if self.current_frame:
-            self.current_frame.destroy()
-
-        if self.after_id is not None:
-            self.after_cancel(self.after_id)
-            self.after_id = None
+        start = time.perf_counter()
 
         frame_creators = {
             "home": self.create_home_frame,
@@ -345,11 +620,110 @@ class App(customtkinter.CTk):
             "logs": self.create_logs_frame
         }
 
-        self.current_frame = frame_creators.get(name, lambda: log.write_debug(f"'{name}' window cannot be found"))()
-        
+        if name not in frame_creators:
+            log.write_debug(f"'{name}' window cannot be found")
+            return
+
         if self.current_frame:
-            self.current_frame.pack(fill="both", expand=True)
-            self.current_frame_name = name
+            self.current_frame.pack_forget()
+
+        if self.after_id is not None:
+            self.after_cancel(self.after_id)
+            self.after_id = None
+
+        # Background tasks are grouped by frame; hidden frames keep receiving their results
+        self.task_group = name
+        frame = self.frames.get(name)
+        built = frame is None
+
+        if built:
+            frame = frame_creators[name]()
+            self.frames[name] = frame
+
+        self.frames.move_to_end(name)
+        self.current_frame = frame
+        self.current_frame_name = name
+
+        frame.pack(fill="both", expand=True)
+        if hasattr(frame, "on_show"):
+            frame.on_show()
+
+        while len(self.frames) > frame_cache_size:
+            self.destroy_frame(next(iter(self.frames)))
+
+        self.report_frame_switch(name, time.perf_counter() - start, built)
+
+    def destroy_frame(self, name):
+        """Destroys a built frame and cancels its background tasks"""
+        frame = self.frames.pop(name, None)
+
+        if frame is None:
+            return
+
+        self.task_executor.cancel_group(name)
+        frame.destroy()
+
+        if name == self.current_frame_name:
+            self.current_frame = None
+            self.current_frame_name = None
+
+    def refresh_frame(self, name=None):
+        """Reloads a frame's data with its `on_refresh` hook, or rebuilds frames without one"""
+        name = name or self.current_frame_name
+        frame = self.frames.get(name)
+
+        if frame is None:
+            return
+
+        if hasattr(frame, "on_refresh"):
+            shown_group, self.task_group = self.task_group, name
+            try:
+                frame.on_refresh()
+            finally:
+                self.task_group = shown_group
+            return
+
+        shown = name == self.current_frame_name
+        self.destroy_frame(name)
+
+        if shown:
+            self.show_frame(name)
+
+    def report_frame_switch(self, name, elapsed, built):
+        """Keeps the latest switch latencies per frame; logged when `log_frame_switch_times` is set"""
+        switch_times = self.frame_switch_times.setdefault(name, {"built": None, "cached": []})
+
+        if built:
+            switch_times["built"] = elapsed
+        else:
+            switch_times["cached"] = (switch_times["cached"] + [elapsed])[-20:]
+
+        if log_frame_switch_times:
+            cached = switch_times["cached"]
+            average = f"{sum(cached) / len(cached) * 1000:.1f} ms" if cached else "-"
+            log.write_log(f"Frame '{name}' shown in {elapsed * 1000:.1f} ms ({'built' if built else 'cached'}), "
+                          f"built in {switch_times['built'] * 1000:.1f} ms, cached switches on average {average}")
+
+    def run_in_background(self, function, *args, on_done=None, on_error=None, pass_token=False, **kwargs):
+        """Runs a backend call off the UI thread; results for frames destroyed in the meantime are dropped"""
+        return self.task_executor.submit(function,
+                                         *args,
+                                         on_done=on_done,
+                                         on_error=on_error,
+                                         group=self.task_group,
+                                         pass_token=pass_token,
+                                         **kwargs)
+
+    def poll_tasks(self):
+        """Delivers results of finished background tasks on the UI thread"""
+        self.task_executor.process_results()
+        self.tasks_after_id = self.after(task_executor.POLL_INTERVAL_MS, self.poll_tasks)
+
+    def on_close(self):
+        if self.tasks_after_id is not None:
+            self.after_cancel(self.tasks_after_id)
+        self.task_executor.shutdown()
+        self.destroy()
 
     def change_appearance(self):
         current_mode = customtkinter.get_appearance_mode()
@@ -379,31 +753,27 @@ class App(customtkinter.CTk):
             log.write_debug("Icon directory name was not set")
             return None
 
-        def load_icon(name):
-            path = os.path.join(base_dir, "imgs", icons_directory, f"{name}.png") if name else None
-            return Image.open(path) if path and os.path.exists(path) else None
-
         if color_icon_name and (light_icon_name or dark_icon_name):
             log.write_debug("Color and light/dark icons cannot be specified at the same time")
             return None
 
-        color_icon = load_icon(color_icon_name)
-        light_icon = load_icon(light_icon_name)
-        dark_icon = load_icon(dark_icon_name)
-
-        if color_icon:
-            return customtkinter.CTkImage(light_image=color_icon, dark_image=color_icon, size=(icon_size, icon_size))
+        if color_icon_name and icon_cache.get_image(icons_directory, color_icon_name):
+            return icon_cache.get_ctk_image(icons_directory, color_icon_name, color_icon_name, icon_size)
 
-        if not light_icon or not dark_icon:
+        if (not light_icon_name or not dark_icon_name
+                or not icon_cache.get_image(icons_directory, light_icon_name)
+                or not icon_cache.get_image(icons_directory, dark_icon_name)):
             log.write_debug("One of the PNG icons is missing")
             return None
 
-        return customtkinter.CTkImage(light_image=dark_icon, dark_image=light_icon, size=(icon_size, icon_size))
+        return icon_cache.get_ctk_image(icons_directory, light_icon_name, dark_icon_name, icon_size)
 
     def select_directory(self, directory_path):
         directory = filedialog.askdirectory()
         if directory:
             directory_path.set(directory)
+            downloads_dir.set_downloads_directory(directory)
+            self.refresh_frame("downloads")
 
     def show_info(self):
         customtkinter.CTkMessagebox(title="Informacja", message="Tutaj możesz wybrać folder docelowy.")
@@ -0,0 +1,257 @@
+import os
+import shutil
+import send2trash
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import log
+from backend import move_engine
+
+BATCH_WORKERS = min(16, (os.cpu_count() or 1) * 2) # File operations mostly wait on the disk
+LOGGED_FAILURES = 10                               # Failed operations listed in the summary log entry
+
+OPERATION_KINDS = ("move", "rename", "remove", "trash")
+
+class Operation:
+    '''
+    One file operation of a batch.
+
+    Parameters
+    ----------
+    kind : str
+        "move" (file or directory), "rename", "remove" (a file, or a directory with all
+        its files) or "trash".
+    source : str
+        Path of the file or directory.
+    destination : str, optional
+        New path for "move" (missing parent directories are created), new name for "rename".
+    '''
+    __slots__ = ("kind", "source", "destination")
+
+    def __init__(self, kind: str, source: str, destination: str=None):
+        self.kind = kind
+        self.source = os.path.abspath(source)
+
+        if kind == "rename" and destination is not None:
+            destination = os.path.join(os.path.dirname(self.source), destination)
+
+        self.destination = os.path.abspath(destination) if destination is not None else None
+
+    def __repr__(self):
+        return f"Operation({self.kind!r}, {self.source!r}, {self.destination!r})"
+
+class OperationResult:
+    '''
+    Outcome of one operation of a batch.
+
+    Attributes
+    ----------
+    operation : Operation
+        The operation.
+    success : bool
+        True if the operation has been done.
+    error : str or None
+        Why the operation has been rejected or failed.
+    '''
+    __slots__ = ("operation", "success", "error")
+
+    def __init__(self, operation: Operation, success: bool, error: str=None):
+        self.operation = operation
+        self.success = success
+        self.error = error
+
+    def __repr__(self):
+        return f"OperationResult({self.operation!r}, success={self.success}, error={self.error!r})"
+
+class _DirectoryListings:
+    '''
+    Names in directories, each directory listed once per batch instead of one stat per path.
+    '''
+    def __init__(self):
+        self._names = {}
+
+    def contains(self, path: str):
+        parent, name = os.path.split(path)
+        names = self._names.get(parent)
+
+        if names is None:
+            try:
+                names = {os.path.normcase(entry) for entry in os.listdir(parent)}
+            except OSError:
+                names = set()
+            self._names[parent] = names
+
+        return os.path.normcase(name) in names
+
+def _is_nested(path: str, parent_path: str):
+    return path.startswith(os.path.join(parent_path, ""))
+
+def validate_operations(operations: list):
+    '''
+    Checks a batch of operations before any of them runs.
+
+    Every source must exist and every "move" or "rename" destination must be free. Because
+    the operations run in parallel, two operations must not share a source or destination
+    and no source or destination may be inside the source of another operation. Existence
+    is checked by listing each involved directory once, not with a system call per path.
+
+    Parameters
+    ----------
+    operations : list[Operation]
+        The operations.
+
+    Returns
+    -------
+    tuple[list[int], dict[int, OperationResult]]
+        Positions of the valid operations in `operations`, and results of the rejected
+        ones by position. An operation passed twice is rejected at its second position.
+    '''
+    listings = _DirectoryListings()
+    valid = []
+    rejected = {}
+    sources = set()
+    destinations = set()
+
+    for index, operation in enumerate(operations):
+        source_key = os.path.normcase(operation.source)
+        destination_key = os.path.normcase(operation.destination) if operation.destination else None
+
+        if operation.kind not in OPERATION_KINDS:
+            error = f"unknown operation '{operation.kind}'"
+        elif operation.kind in ("move", "rename") and operation.destination is None:
+            error = "destination is missing"
+        elif source_key in sources:
+            error = "source is used by another operation"
+        elif destination_key is not None and (destination_key in destinations or destination_key in sources):
+            error = "destination is used by another operation"
+        elif not listings.contains(operation.source):
+            error = "source doesn't exist"
+        elif destination_key is not None and listings.contains(operation.destination):
+            error = "destination already exists"
+        elif destination_key is not None and _is_nested(destination_key, source_key):
+            error = "destination is inside the source"
+        else:
+            error = None
+
+        if error is not None:
+            rejected[index] = OperationResult(operation, False, error)
+            continue
+
+        sources.add(source_key)
+        if destination_key is not None:
+            destinations.add(destination_key)
+        valid.append(index)
+
+    # In paths sorted by their components, the paths nested in a source follow right after it
+    nested_sources = set()
+    parent = None
+
+    for path in sorted(sources, key=lambda path: path.split(os.sep)):
+        if parent is not None and _is_nested(path, parent):
+            nested_sources.add(path)
+        else:
+            parent = path
+
+    if nested_sources:
+        for index in valid:
+            if os.path.normcase(operations[index].source) in nested_sources:
+                rejected[index] = OperationResult(operations[index], False, "source is inside the source of another operation")
+        valid = [index for index in valid if index not in rejected]
+
+    # A destination inside the source of another operation would be moved or removed with it
+    valid_sources = {os.path.normcase(operations[index].source) for index in valid}
+
+    for index in valid:
+        destination = operations[index].destination
+        if destination is None:
+            continue
+
+        parent = os.path.dirname(os.path.normcase(destination))
+        while parent not in valid_sources and os.path.dirname(parent) != parent:
+            parent = os.path.dirname(parent)
+
+        if parent in valid_sources:
+            rejected[index] = OperationResult(operations[index], False, "destination is inside the source of another operation")
+
+    valid = [index for index in valid if index not in rejected]
+
+    return valid, rejected
+
+def _run_operation(operation: Operation):
+    try:
+        if operation.kind in ("move", "rename"):
+            # The destination may have appeared since the validation; never overwrite it
+            if os.path.lexists(operation.destination):
+                return OperationResult(operation, False, "destination already exists")
+
+            if operation.kind == "move":
+                os.makedirs(os.path.dirname(operation.destination), exist_ok=True)
+                move_engine.move(operation.source, operation.destination)
+            else:
+                move_engine.rename_no_replace(operation.source, operation.destination)
+        elif operation.kind == "remove":
+            if os.path.isdir(operation.source) and not os.path.islink(operation.source):
+                shutil.rmtree(operation.source)
+            else:
+                os.remove(operation.source)
+        else:
+            send2trash.send2trash(operation.source)
+
+        return OperationResult(operation, True)
+    except Exception as error:
+        return OperationResult(operation, False, f"{type(error).__name__}: {error}")
+
+def run_operations(operations: list, max_workers: int=BATCH_WORKERS):
+    '''
+    Validates a batch of file operations and runs the valid ones on a thread pool.
+
+    Unlike the single-path functions of `dir_operations`, operations don't write their own
+    log entries; the whole batch is summarised in one entry.
+
+    Parameters
+    ----------
+    operations : list[Operation]
+        The operations.
+    max_workers : int, optional
+        Maximum number of operations running at the same time.
+
+    Returns
+    -------
+    list[OperationResult]
+        Result of every operation, in the order of `operations`.
+    '''
+    try:
+        operations = list(operations)
+        valid, rejected = validate_operations(operations)
+        valid_operations = [operations[index] for index in valid]
+
+        if len(valid) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(valid))) as executor:
+                done = list(executor.map(_run_operation, valid_operations))
+        else:
+            done = [_run_operation(operation) for operation in valid_operations]
+
+        results = [None] * len(operations)
+        for index, result in zip(valid, done):
+            results[index] = result
+        for index, result in rejected.items():
+            results[index] = result
+
+        _log_summary(results)
+
+        return results
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while running a batch of {len(operations)} file operations")
+        return
+
+def _log_summary(results: list):
+    failed = [result for result in results if not result.success]
+    message = f"Batch of {len(results)} file operations finished: {len(results) - len(failed)} done, {len(failed)} failed"
+
+    if failed:
+        details = "; ".join(f"{result.operation.kind} '{result.operation.source}': {result.error}"
+                            for result in failed[:LOGGED_FAILURES])
+        more = f"; and {len(failed) - LOGGED_FAILURES} more" if len(failed) > LOGGED_FAILURES else ""
+        message += f" ({details}{more})"
+
+    log.write_log(message)
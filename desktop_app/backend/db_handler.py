@@ -0,0 +1,525 @@
+import os
+import sqlite3
+import threading
+import time
+
+from backend import log
+from backend import stats
+from backend import utils
+from backend.file_record import FileRecord
+
+database_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "database.db")
+
+SCHEMA_VERSION = 3
+UPSERT_BATCH_SIZE = 1000
+
+# Columns the file listing can be ordered by
+ORDER_COLUMNS = ("path", "suffix", "type", "size", "mtime", "birthtime")
+
+# Scripts upgrading the schema from the previous version, by target version
+MIGRATIONS = {
+    1: """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    suffix TEXT NOT NULL,
+    type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    birthtime REAL NOT NULL,
+    scanned_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_directory_suffix ON files (directory, suffix);
+CREATE INDEX IF NOT EXISTS files_directory_size ON files (directory, size);
+CREATE INDEX IF NOT EXISTS files_directory_birthtime ON files (directory, birthtime);
+CREATE INDEX IF NOT EXISTS files_directory_mtime ON files (directory, mtime);
+""",
+    2: """
+ALTER TABLE files ADD COLUMN inode INTEGER NOT NULL DEFAULT 0;
+""",
+    3: """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    path TEXT NOT NULL,
+    partial_hash TEXT,
+    full_hash TEXT,
+    PRIMARY KEY (inode, size, mtime, path)
+);
+CREATE INDEX IF NOT EXISTS file_hashes_path ON file_hashes (path);
+"""
+}
+
+UPSERT_FILE = """
+INSERT INTO files (path, directory, suffix, type, size, mtime, birthtime, inode, scanned_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (path) DO UPDATE SET
+    directory = excluded.directory,
+    suffix = excluded.suffix,
+    type = excluded.type,
+    size = excluded.size,
+    mtime = excluded.mtime,
+    birthtime = excluded.birthtime,
+    inode = excluded.inode,
+    scanned_at = excluded.scanned_at
+"""
+
+UPSERT_FILE_HASH = """
+INSERT INTO file_hashes (inode, size, mtime, path, partial_hash, full_hash)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (inode, size, mtime, path) DO UPDATE SET
+    partial_hash = COALESCE(excluded.partial_hash, partial_hash),
+    full_hash = COALESCE(excluded.full_hash, full_hash)
+"""
+
+# Hashes of a file stored under another signature (the file has been edited) or, for files
+# with an inode number, under another path (the file has been renamed)
+DELETE_OUTDATED_FILE_HASHES = """
+DELETE FROM file_hashes
+WHERE (path = ?4 AND (inode, size, mtime) != (?1, ?2, ?3))
+   OR (?1 != 0 AND inode = ?1 AND size = ?2 AND mtime = ?3 AND path != ?4)
+"""
+
+# Hashes of a file about to be removed from `files`, stored under its path or its signature,
+# unless another indexed file has the signature (the file has been renamed)
+DELETE_REMOVED_FILE_HASHES = """
+DELETE FROM file_hashes
+WHERE (path = ?1 OR (inode != 0 AND (inode, size, mtime) IN (SELECT inode, size, mtime FROM files WHERE path = ?1)))
+  AND NOT EXISTS (
+    SELECT 1 FROM files
+    WHERE files.path != ?1 AND files.inode = file_hashes.inode AND files.size = file_hashes.size
+      AND files.mtime = file_hashes.mtime AND file_hashes.inode != 0
+)
+"""
+
+_local = threading.local()
+
+def set_database_path(path: str):
+    '''
+    Changes the database file used by the following calls.
+
+    Connections are per thread, so every thread reconnects on its next call.
+
+    Parameters
+    ----------
+    path : str
+        The path to the SQLite database file. Created if it doesn't exist.
+    '''
+    global database_path
+    database_path = os.path.abspath(path)
+
+def get_connection():
+    '''
+    Returns the database connection of the current thread.
+
+    The connection is opened on first use in a thread, with write-ahead logging enabled
+    (readers don't block the writer) and the schema created if needed.
+
+    Returns
+    -------
+    sqlite3.Connection
+        The open connection.
+    '''
+    connection = getattr(_local, "connection", None)
+
+    if connection is not None and _local.path == database_path:
+        return connection
+
+    if connection is not None:
+        connection.close()
+
+    os.makedirs(os.path.dirname(database_path), exist_ok=True)
+
+    connection = sqlite3.connect(database_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    create_schema(connection)
+
+    _local.connection = connection
+    _local.path = database_path
+
+    return connection
+
+def close_connection():
+    '''
+    Closes the database connection of the current thread, if it is open.
+    '''
+    connection = getattr(_local, "connection", None)
+
+    if connection is not None:
+        connection.close()
+        _local.connection = None
+
+def create_schema(connection: sqlite3.Connection):
+    '''
+    Creates the tables and indexes, or upgrades them to the current schema version.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        The open connection.
+
+    Notes
+    -----
+    - The version is read again inside a write transaction, so connections opened at the
+      same time (e.g. by several threads) don't run the same migrations twice.
+    '''
+    if connection.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+
+    connection.execute("BEGIN IMMEDIATE")
+
+    try:
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+
+        for target_version in range(version + 1, SCHEMA_VERSION + 1):
+            # Statements run one by one, as `executescript` would commit the open transaction
+            for statement in MIGRATIONS[target_version].split(";"):
+                if statement.strip():
+                    connection.execute(statement)
+            connection.execute(f"PRAGMA user_version={target_version}")
+
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+def _to_row(directory_path: str, record: FileRecord, scanned_at: float):
+    return (record.path, directory_path, record.suffix, record.type, record.byte_size, record.mtime, record.birthtime, record.inode, scanned_at)
+
+def _to_record(row: tuple):
+    path, suffix, file_type, size, mtime, birthtime, inode = row
+    return FileRecord(path=path, suffix=suffix, file_type=file_type, byte_size=size, birthtime=birthtime, mtime=mtime, inode=inode)
+
+def _upsert(connection: sqlite3.Connection, directory_path: str, records, batch_size: int, scanned_at: float):
+    written = 0
+    rows = (_to_row(directory_path, record, scanned_at) for record in records)
+
+    for batch in utils.batched(rows, batch_size):
+        connection.executemany(UPSERT_FILE, batch)
+        written += len(batch)
+
+    return written
+
+def upsert_files(directory_path: str, records, batch_size: int=UPSERT_BATCH_SIZE):
+    '''
+    Inserts or updates records of files from one directory.
+
+    Records are written with `executemany` in batches, all in one transaction.
+
+    Parameters
+    ----------
+    directory_path : str
+        The directory the files belong to.
+    records : Iterable[FileRecord]
+        Records of the files.
+    batch_size : int, optional
+        Number of records written with one `executemany` call.
+
+    Returns
+    -------
+    int or None
+        Number of written records, None if an error occurs.
+    '''
+    try:
+        connection = get_connection()
+
+        with connection:
+            return _upsert(connection, directory_path, records, batch_size, time.time())
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while saving files of directory '{directory_path}' to the database")
+        return
+
+def replace_directory_files(directory_path: str, records, batch_size: int=UPSERT_BATCH_SIZE):
+    '''
+    Replaces the stored files of a directory with the given records.
+
+    Records are upserted in batches and files of the directory which were not among them
+    are deleted afterwards, all in one transaction, so readers never see a half-written
+    directory.
+
+    Parameters
+    ----------
+    directory_path : str
+        The directory the files belong to.
+    records : Iterable[FileRecord]
+        Records of all files of the directory.
+    batch_size : int, optional
+        Number of records written with one `executemany` call.
+
+    Returns
+    -------
+    int or None
+        Number of stored records, None if an error occurs.
+    '''
+    try:
+        connection = get_connection()
+        scanned_at = time.time()
+
+        with connection:
+            written = _upsert(connection, directory_path, records, batch_size, scanned_at)
+            removed_paths = connection.execute("SELECT path FROM files WHERE directory = ? AND scanned_at < ?",
+                                               (directory_path, scanned_at)).fetchall()
+            connection.executemany(DELETE_REMOVED_FILE_HASHES, removed_paths)
+            connection.execute("DELETE FROM files WHERE directory = ? AND scanned_at < ?", (directory_path, scanned_at))
+
+        return written
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while saving files of directory '{directory_path}' to the database")
+        return
+
+def get_snapshot(directory_path: str):
+    '''
+    Returns the stored change signatures of the files of a directory.
+
+    Parameters
+    ----------
+    directory_path : str
+        The directory the files belong to.
+
+    Returns
+    -------
+    dict[str, tuple[int, float, int]] or None
+        Inode, modification time and size by path (see `FileRecord.get_signature`),
+        None if an error occurs.
+    '''
+    try:
+        rows = get_connection().execute("SELECT path, inode, mtime, size FROM files WHERE directory = ?", (directory_path,))
+        return {path: (inode, mtime, size) for path, inode, mtime, size in rows}
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while reading files of directory '{directory_path}' from the database")
+        return
+
+def apply_delta(directory_path: str, upserted_records: list, removed_paths: list, batch_size: int=UPSERT_BATCH_SIZE):
+    '''
+    Stores new and changed files and deletes removed files of a directory in one transaction.
+
+    Parameters
+    ----------
+    directory_path : str
+        The directory the files belong to.
+    upserted_records : list[FileRecord]
+        Records of added and changed files.
+    removed_paths : list[str]
+        Paths of removed files.
+    batch_size : int, optional
+        Number of records written with one `executemany` call.
+
+    Returns
+    -------
+    bool
+        True if the changes have been stored, False if an error occurs.
+    '''
+    try:
+        connection = get_connection()
+
+        with connection:
+            _upsert(connection, directory_path, upserted_records, batch_size, time.time())
+            connection.executemany(DELETE_REMOVED_FILE_HASHES, ((path,) for path in removed_paths))
+            connection.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in removed_paths))
+
+        return True
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while saving changes of directory '{directory_path}' to the database")
+        return False
+
+def _build_filter(directory_path: str, suffix: str=None, file_type: str=None):
+    conditions = ["directory = ?"]
+    parameters = [directory_path]
+
+    if suffix is not None:
+        conditions.append("suffix = ?")
+        parameters.append(suffix)
+
+    if file_type is not None:
+        conditions.append("type = ?")
+        parameters.append(file_type)
+
+    return " AND ".join(conditions), parameters
+
+def get_files(directory_path: str,
+              suffix: str=None,
+              file_type: str=None,
+              order_by: str="path",
+              descending: bool=False,
+              limit: int=None,
+              offset: int=0):
+    '''
+    Returns stored files of a directory, filtered, ordered and paged by the database.
+
+    Parameters
+    ----------
+    directory_path : str
+        The directory the files belong to.
+    suffix : str, optional
+        Only files with this suffix are returned.
+    file_type : str, optional
+        Only files of this type ("file", "directory", ...) are returned.
+    order_by : str, optional
+        One of "path", "suffix", "type", "size", "mtime" or "birthtime".
+    descending : bool, optional
+        If True, files are returned in descending order.
+    limit : int, optional
+        Maximum number of files. All files if None.
+    offset : int, optional
+        Number of files to skip.
+
+    Returns
+    -------
+    list[FileRecord] or None
+        The stored files, None if an error occurs.
+    '''
+    try:
+        if order_by not in ORDER_COLUMNS:
+            log.write_debug(f"Files cannot be ordered by '{order_by}'")
+            return
+
+        where, parameters = _build_filter(directory_path, suffix, file_type)
+        query = (f"SELECT path, suffix, type, size, mtime, birthtime, inode FROM files WHERE {where} "
+                 f"ORDER BY {order_by} {'DESC' if descending else 'ASC'}, path LIMIT ? OFFSET ?")
+
+        rows = get_connection().execute(query, (*parameters, -1 if limit is None else limit, offset))
+
+        return [_to_record(row) for row in rows]
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while reading files of directory '{directory_path}' from the database")
+        return
+
+def count_files(directory_path: str, suffix: str=None, file_type: str=None):
+    '''
+    Returns the number of stored files of a directory.
+
+    Parameters
+    ----------
+    directory_path : str
+        The directory the files belong to.
+    suffix : str, optional
+        Only files with this suffix are counted.
+    file_type : str, optional
+        Only files of this type are counted.
+
+    Returns
+    -------
+    int or None
+        Number of files, None if an error occurs.
+    '''
+    try:
+        where, parameters = _build_filter(directory_path, suffix, file_type)
+        return get_connection().execute(f"SELECT COUNT(*) FROM files WHERE {where}", parameters).fetchone()[0]
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while counting files of directory '{directory_path}' in the database")
+        return
+
+def get_aggregated_stats(directory_path: str, keys: tuple=("suffix", "type")):
+    '''
+    Computes size statistics of the stored files of a directory with grouped queries.
+
+    Returns the same structure as `stats.aggregate`, without reading the directory.
+
+    Parameters
+    ----------
+    directory_path : str
+        The directory the files belong to.
+    keys : tuple[str], optional
+        Columns to group by, "suffix" and/or "type".
+
+    Returns
+    -------
+    tuple[stats.GroupStats, dict[str, dict[str, stats.GroupStats]]] or None
+        Statistics of all files and of each group, None if an error occurs.
+    '''
+    try:
+        connection = get_connection()
+        aggregates = "COUNT(*), COALESCE(SUM(size), 0), MIN(size), MAX(size)"
+
+        row = connection.execute(f"SELECT {aggregates} FROM files WHERE directory = ?", (directory_path,)).fetchone()
+        total = stats.GroupStats.from_values(*row)
+
+        groups = {}
+        for key in keys:
+            if key not in ("suffix", "type"):
+                log.write_debug(f"Files cannot be grouped by '{key}'")
+                return
+
+            rows = connection.execute(f"SELECT {key}, {aggregates} FROM files WHERE directory = ? GROUP BY {key}", (directory_path,))
+            groups[key] = {value: stats.GroupStats.from_values(*values) for value, *values in rows}
+
+        return total, groups
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while computing stats of directory '{directory_path}' in the database")
+        return
+
+def get_file_hashes(signatures, batch_size: int=300):
+    '''
+    Returns the stored hashes of files with the given signatures.
+
+    Parameters
+    ----------
+    signatures : Iterable[tuple[int, int, float]]
+        Inode, size and modification time of the files.
+    batch_size : int, optional
+        Number of signatures looked up with one query.
+
+    Returns
+    -------
+    list[tuple[int, int, float, str, str, str]] or None
+        Inode, size, modification time, path, partial hash and full hash (either hash may
+        be None) of the matching stored files, None if an error occurs.
+    '''
+    try:
+        connection = get_connection()
+        rows = []
+
+        for batch in utils.batched(set(signatures), batch_size):
+            values = ", ".join("(?, ?, ?)" for _ in batch)
+            rows.extend(connection.execute(f"SELECT inode, size, mtime, path, partial_hash, full_hash FROM file_hashes "
+                                           f"WHERE (inode, size, mtime) IN (VALUES {values})",
+                                           [value for signature in batch for value in signature]))
+
+        return rows
+    except Exception:
+        log.write_debug()
+        log.write_log("Error occured while reading file hashes from the database")
+        return
+
+def save_file_hashes(rows, batch_size: int=UPSERT_BATCH_SIZE):
+    '''
+    Inserts or updates hashes of files.
+
+    Hashes stored for an earlier version of a file (same path, other signature) or under
+    its previous path (same signature and inode number, other path) are deleted.
+
+    Parameters
+    ----------
+    rows : Iterable[tuple[int, int, float, str, str, str]]
+        Inode, size, modification time, path, partial hash and full hash of every file.
+        A hash given as None keeps the stored value.
+    batch_size : int, optional
+        Number of rows written with one `executemany` call.
+
+    Returns
+    -------
+    bool
+        True if the hashes have been saved, False if an error occurs.
+    '''
+    try:
+        connection = get_connection()
+
+        with connection:
+            for batch in utils.batched(rows, batch_size):
+                connection.executemany(DELETE_OUTDATED_FILE_HASHES, (row[:4] for row in batch))
+                connection.executemany(UPSERT_FILE_HASH, batch)
+
+        return True
+    except Exception:
+        log.write_debug()
+        log.write_log("Error occured while saving file hashes to the database")
+        return False
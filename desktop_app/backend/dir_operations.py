@@ -2,11 +2,16 @@ import pathlib
 import os
 import send2trash
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from backend import log
+from backend import move_engine
 from backend import utils
 
+STATS_WORKERS = min(32, (os.cpu_count() or 1) * 4) # Directory scans wait on I/O, so more threads than cores pay off
+STATS_MAX_PARALLEL_DEPTH = 3                        # Deepest level split into parallel tasks
+
 def directory_already_exists(directory_path: str):
     '''
     Checks if a directory already exists at the given path.
@@ -198,16 +203,29 @@ def rename_directory(directory_path: str, new_directory_name: str):
         log.write_log(f"Error occured while renaming directory '{dir_path.name}'")
         return
     
-def move_directory(directory_path: str, new_directory_path):
+def move_directory(directory_path: str, new_directory_path, progress_callback=None, cancel_event=None):
     '''
     Moves a directory to a new location.
 
+    The directory is renamed when possible; across drives it is copied with
+    `move_engine.move`, so the move reports progress and can be cancelled.
+
     Parameters
     ----------
     directory_path : str
         The path of the directory to be moved.
     new_directory_path : str
         The destination path where the directory should be moved.
+    progress_callback : Callable[[int, int], None], optional
+        Called with the copied and total bytes during the move.
+    cancel_event : threading.Event, optional
+        Set it from another thread to cancel the move. The directory then stays at its
+        original location.
+
+    Returns
+    -------
+    pathlib.Path or None
+        The new path of the directory if successful, None otherwise.
     '''
     try:
         dir_path = pathlib.Path(directory_path)
@@ -221,14 +239,175 @@ def move_directory(directory_path: str, new_directory_path):
             log.write_log(f"Cannot move directory '{dir_path.name}', because it already exists at the destination '{new_directory_path}'.")
             return
         
-        shutil.move(dir_path, new_dir_path)
+        move_engine.move(dir_path, new_dir_path, progress_callback, cancel_event)
         log.write_log(f"Directory '{dir_path.name}' has been moved to new localisation")
 
+        return new_dir_path
+    except move_engine.MoveCancelled:
+        log.write_log(f"Moving directory '{dir_path.name}' has been cancelled")
+        return
     except Exception:
         log.write_debug()
         log.write_log(f"Error occured while moving directory '{dir_path.name}'")
         return
+
+def move_file(file_path: str, new_file_path: str, progress_callback=None, cancel_event=None):
+    '''
+    Moves a file to a new location.
+
+    The file is renamed when possible and copied with `move_engine.move` across drives.
+
+    Parameters
+    ----------
+    file_path : str
+        The path of the file to be moved.
+    new_file_path : str
+        The destination path of the file, including its name.
+    progress_callback : Callable[[int, int], None], optional
+        Called with the copied and total bytes during the move.
+    cancel_event : threading.Event, optional
+        Set it from another thread to cancel the move. The file then stays at its
+        original location.
+
+    Returns
+    -------
+    pathlib.Path or None
+        The new path of the file if successful, None otherwise.
+    '''
+    try:
+        path = pathlib.Path(file_path)
+        new_path = pathlib.Path(new_file_path)
+
+        if not path.is_file():
+            log.write_log(f"File '{path.name}' does not exist and cannot be moved.")
+            return
+
+        if new_path.exists():
+            log.write_log(f"Cannot move file '{path.name}', because it already exists at the destination '{new_file_path}'.")
+            return
+
+        move_engine.move(path, new_path, progress_callback, cancel_event)
+        log.write_log(f"File '{path.name}' has been moved to '{new_path.parent}'")
+
+        return new_path
+    except move_engine.MoveCancelled:
+        log.write_log(f"Moving file '{path.name}' has been cancelled")
+        return
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while moving file '{path.name}'")
+        return
     
+def scan_directory_level(directory_path: str):
+    '''
+    Counts the files directly inside a directory and lists its subdirectories.
+
+    Symbolic links to directories are not followed, like in `pathlib.Path.rglob`.
+    Entries which cannot be read are skipped.
+
+    Parameters
+    ----------
+    directory_path : str
+        The path to the directory.
+
+    Returns
+    -------
+    tuple[int, int, list[str]]
+        Number of files, their total size in bytes and paths of the subdirectories.
+    '''
+    file_count = 0
+    byte_size = 0
+    subdirectories = []
+
+    try:
+        with os.scandir(directory_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file():
+                        file_count += 1
+                        byte_size += entry.stat().st_size
+                except OSError:
+                    continue
+    except OSError:
+        pass
+
+    return file_count, byte_size, subdirectories
+
+def walk_tree_size(directory_path: str):
+    '''
+    Counts files and their total size in a directory tree, in the calling thread.
+
+    The tree is walked with an explicit stack of paths, so only the directories waiting to
+    be scanned are kept in memory, never the list of files.
+
+    Parameters
+    ----------
+    directory_path : str
+        The path to the root of the tree.
+
+    Returns
+    -------
+    tuple[int, int]
+        Number of files and their total size in bytes.
+    '''
+    file_count = 0
+    byte_size = 0
+    stack = [directory_path]
+
+    while stack:
+        level_file_count, level_byte_size, subdirectories = scan_directory_level(stack.pop())
+        file_count += level_file_count
+        byte_size += level_byte_size
+        stack.extend(subdirectories)
+
+    return file_count, byte_size
+
+def get_tree_size(directory_path: str, max_workers: int=STATS_WORKERS):
+    '''
+    Counts files and their total size in a directory tree, scanning subtrees in parallel.
+
+    The top levels are scanned level by level on a thread pool until there are enough
+    subtrees to keep every worker busy (or `STATS_MAX_PARALLEL_DEPTH` is reached); the
+    remaining subtrees are then walked on the pool with `walk_tree_size` and their counts
+    are summed. Workers never wait for each other, so the bounded pool cannot deadlock.
+
+    Parameters
+    ----------
+    directory_path : str
+        The path to the root of the tree.
+    max_workers : int, optional
+        Number of threads. 1 walks the tree in the calling thread.
+
+    Returns
+    -------
+    tuple[int, int]
+        Number of files and their total size in bytes.
+    '''
+    if max_workers <= 1:
+        return walk_tree_size(directory_path)
+
+    file_count, byte_size, frontier = scan_directory_level(directory_path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for _ in range(STATS_MAX_PARALLEL_DEPTH):
+            if not frontier or len(frontier) >= max_workers * 4:
+                break
+
+            next_frontier = []
+            for level_file_count, level_byte_size, subdirectories in executor.map(scan_directory_level, frontier):
+                file_count += level_file_count
+                byte_size += level_byte_size
+                next_frontier.extend(subdirectories)
+            frontier = next_frontier
+
+        for subtree_file_count, subtree_byte_size in executor.map(walk_tree_size, frontier):
+            file_count += subtree_file_count
+            byte_size += subtree_byte_size
+
+    return file_count, byte_size
+
 def get_dictionary_stats(directory_path: str):
     '''
     Retrieves statistics about a specified directory.
@@ -262,17 +441,17 @@ def get_dictionary_stats(directory_path: str):
             log.write_log(f"Directory '{dir_path.name}' is not a directory")
             return
         
-        files = [file for file in dir_path.rglob("*") if file.is_file()]
-        byte_size = sum(file.stat().st_size for file in files)
-        subdirectory_count = len([f for f in dir_path.iterdir() if f.is_dir()])
+        file_count, byte_size = get_tree_size(str(dir_path))
+        with os.scandir(dir_path) as entries:
+            subdirectory_count = sum(1 for entry in entries if entry.is_dir())
         
         directory_info = {
             "name": dir_path.name,
-            "file_count": len(files),
+            "file_count": file_count,
             "byte_size": byte_size,
             "size": utils.format_bytes(byte_size),
             "subdirectory_count": subdirectory_count,
-            "creation_time": datetime.fromtimestamp(dir_path.stat().st_birthtime).strftime("%Y-%m-%d %H:%M:%S")
+            "creation_time": datetime.fromtimestamp(utils.get_creation_time(dir_path.stat())).strftime("%Y-%m-%d %H:%M:%S")
         }
     
         return directory_info
@@ -1,48 +1,261 @@
-import winreg
+import os
+import stat
 import pathlib
-import ctypes
-from datetime import datetime
-from collections import Counter
+import threading
 
+from backend import db_handler
+from backend import downloads_path
+from backend import file_listing
+from backend import index_sync
 from backend import log
+from backend import stats
 from backend import utils
+from backend import file_record
+from backend.file_record import FileRecord
 
+# In-memory sorting and search indexes of the "Downloads" folder, loaded from the database index on first use
+_listing_index = None
+_listing_index_lock = threading.Lock()
 
 def get_path_to_downloads_directory():
     '''
-    Retrieves the absolute path to the user's "Downloads" folder on Windows.
+    Retrieves the absolute path to the user's "Downloads" folder.
 
-    This function reads the Windows Registry to obtain the system-defined path to the "Downloads" 
-    directory for the current user.
+    The path is looked up once (in the Windows Registry, the XDG "user-dirs.dirs" file on
+    Linux, or the directory selected by the user) and shared by the scanner and the UI
+    until it changes, see `backend.downloads_path`.
 
     Returns
     -------
-    str
-        The absolute path to the "Downloads" folder.
+    str or None
+        The absolute path to the "Downloads" folder, None if it has not been found.
+    '''
+    return downloads_path.get_downloads_path()
+
+def set_downloads_directory(directory_path: str=None):
+    '''
+    Uses the given directory as the "Downloads" folder, e.g. after the user selected it.
+
+    The in-memory listing of the previous directory is dropped; the database index of
+    the new one is brought up to date by the next `sync_downloads_index`.
+
+    Parameters
+    ----------
+    directory_path : str, optional
+        The directory. None to go back to the system "Downloads" folder.
     '''
-    key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Shell Folders")
-    downloads_path, _ = winreg.QueryValueEx(key, "{374DE290-123F-4565-9164-39C4925E467B}")
+    global _listing_index
+
+    downloads_path.set_override(directory_path)
 
-    return downloads_path
-    
-def is_hidden_or_system_file(filepath: str):
+    with _listing_index_lock:
+        _listing_index = None
+
+def is_hidden_or_system_entry(entry: os.DirEntry, entry_stat: os.stat_result):
     '''
-    Checks if a file is hidden or a system file on Windows.
+    Checks if a directory entry is hidden or a system file, using its already retrieved stat.
+
+    On Windows the file attributes are part of the stat result, so no extra system call is
+    needed. On other systems, names starting with a dot are treated as hidden.
 
     Parameters
     ----------
-    filepath : str
-        The absolute or relative path to the file.
+    entry : os.DirEntry
+        The directory entry returned by `os.scandir`.
+    entry_stat : os.stat_result
+        The stat result of the entry.
 
     Returns
     -------
     bool
-        True if the file is hidden or a system file, False otherwise.
+        True if the entry is hidden or a system file, False otherwise.
+    '''
+    attributes = getattr(entry_stat, "st_file_attributes", None)
+
+    if attributes is None:
+        return entry.name.startswith(".")
+
+    return bool(attributes & (stat.FILE_ATTRIBUTE_HIDDEN | stat.FILE_ATTRIBUTE_SYSTEM))
+
+def scan_directory(directory_path: str):
+    '''
+    Yields visible entries of a directory together with their stat results.
+
+    The directory is read with `os.scandir`, which returns the entry type with the listing
+    (and on Windows also the full stat), so every entry costs at most one stat call.
+    Entries that disappear while scanning and broken symbolic links are skipped.
+
+    Parameters
+    ----------
+    directory_path : str
+        The path to the directory.
+
+    Yields
+    ------
+    tuple[os.DirEntry, os.stat_result]
+        A visible (non-hidden and non-system) entry and its stat result.
+    '''
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            try:
+                entry_stat = entry.stat()
+            except OSError:
+                continue
+
+            if not is_hidden_or_system_entry(entry, entry_stat):
+                yield entry, entry_stat
+
+def get_entry_type(entry: os.DirEntry):
     '''
-    FILE_ATTRIBUTE_HIDDEN = 0x2  # Attribute value of hidden file on WinOS
-    FILE_ATTRIBUTE_SYSTEM = 0x4  # Attribute value of system file on WinOS
-    attr = ctypes.windll.kernel32.GetFileAttributesW(str(filepath))
-    return (attr & FILE_ATTRIBUTE_HIDDEN > 0) or (attr & FILE_ATTRIBUTE_SYSTEM > 0)
+    Returns the type of a directory entry without additional system calls.
+
+    Parameters
+    ----------
+    entry : os.DirEntry
+        The directory entry returned by `os.scandir`.
+
+    Returns
+    -------
+    str
+        "directory", "file", "symlink", or "unknown".
+    '''
+    if entry.is_dir():
+        return "directory"
+    elif entry.is_file():
+        return "file"
+    elif entry.is_symlink():
+        return "symlink"
+    else:
+        return "unknown"
+
+def create_file_record(entry: os.DirEntry, entry_stat: os.stat_result):
+    '''
+    Creates a FileRecord from a directory entry and its stat result.
+
+    Parameters
+    ----------
+    entry : os.DirEntry
+        The directory entry returned by `os.scandir`.
+    entry_stat : os.stat_result
+        The stat result of the entry.
+
+    Returns
+    -------
+    FileRecord
+        The record of the entry.
+    '''
+    return FileRecord(path=entry.path,
+                      suffix=file_record.get_suffix(entry.name),
+                      file_type=get_entry_type(entry),
+                      byte_size=entry_stat.st_size,
+                      birthtime=utils.get_creation_time(entry_stat),
+                      mtime=entry_stat.st_mtime,
+                      inode=entry_stat.st_ino)
+
+def get_file_record(path: str):
+    '''
+    Creates a FileRecord of a single file or directory from its path.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file or directory.
+
+    Returns
+    -------
+    FileRecord or None
+        The record, None if the path doesn't exist.
+    '''
+    try:
+        entry_stat = os.stat(path)
+    except OSError:
+        return None
+
+    if stat.S_ISDIR(entry_stat.st_mode):
+        file_type = "directory"
+    elif stat.S_ISREG(entry_stat.st_mode):
+        file_type = "file"
+    else:
+        file_type = "unknown"
+
+    return FileRecord(path=os.path.abspath(path),
+                      suffix=file_record.get_suffix(os.path.basename(path)),
+                      file_type=file_type,
+                      byte_size=entry_stat.st_size,
+                      birthtime=utils.get_creation_time(entry_stat),
+                      mtime=entry_stat.st_mtime,
+                      inode=entry_stat.st_ino)
+
+def get_downloads_directory_real_path():
+    '''
+    Returns the resolved path to the "Downloads" directory.
+
+    The path is resolved once per scan, so entry paths are absolute without
+    resolving every entry.
+
+    Returns
+    -------
+    str or None
+        The resolved path, or None if the "Downloads" directory has not been found.
+    '''
+    download_dir_path = get_path_to_downloads_directory()
+
+    if download_dir_path is None:
+        log.write_debug("Path to Downloads directory has not been found")
+        return None
+
+    return os.path.realpath(download_dir_path)
+
+def iter_files(batch_size: int=None):
+    '''
+    Yields paths of non-hidden and non-system files and directories 
+    from the user's "Downloads" folder as they are discovered.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        If given, paths are yielded in lists of up to `batch_size` items.
+
+    Yields
+    ------
+    pathlib.Path or list[pathlib.Path]
+        A path of a visible file or directory, or a batch of them.
+    '''
+    download_dir_path = get_downloads_directory_real_path()
+
+    if download_dir_path is None:
+        return
+
+    paths = (pathlib.Path(entry.path) for entry, _ in scan_directory(download_dir_path))
+
+    yield from utils.batched(paths, batch_size) if batch_size else paths
+
+def iter_files_info(batch_size: int=None):
+    '''
+    Yields information about visible files and directories in the user's "Downloads"
+    folder as they are discovered.
+
+    Consumers can start working on the first entries (or batches) before the whole
+    directory has been read, and memory use doesn't grow with the directory size.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        If given, records are yielded in lists of up to `batch_size` items.
+
+    Yields
+    ------
+    FileRecord or list[FileRecord]
+        A record of a visible file or directory, or a batch of them.
+    '''
+    download_dir_path = get_downloads_directory_real_path()
+
+    if download_dir_path is None:
+        return
+
+    records = (create_file_record(entry, entry_stat) for entry, entry_stat in scan_directory(download_dir_path))
+
+    yield from utils.batched(records, batch_size) if batch_size else records
 
 def get_all_files_path_from_DD():
     '''
@@ -51,6 +264,7 @@ def get_all_files_path_from_DD():
 
     This function first determines the absolute path to the "Downloads" directory, 
     then iterates through its contents, filtering out hidden and system files.
+    Use `iter_files` to process the paths as they are discovered.
 
     Returns
     -------
@@ -58,19 +272,7 @@ def get_all_files_path_from_DD():
         A list containing pathlib.Path objects representing the paths of 
         visible files and directories in the "Downloads" folder.
     '''
-    download_dir_path = pathlib.Path(get_path_to_downloads_directory())
-    
-    if download_dir_path is None:
-        log.write_debug("Path to Downloads directory has not been found")
-        return
-
-    files_paths = []
-
-    for file in download_dir_path.iterdir():
-        if not is_hidden_or_system_file(file):
-            files_paths.append(file)
-
-    return files_paths
+    return list(iter_files())
 
 def get_files_info():
     '''
@@ -79,11 +281,14 @@ def get_files_info():
 
     This function gathers metadata such as name, suffix, type, size, creation date, 
     and absolute path for each file or directory in the "Downloads" directory.
+    The directory is scanned once with `scan_directory`, reusing a single stat per entry.
+    Use `iter_files_info` to process the records as they are discovered.
 
     Returns
     -------
-    list[dict]
-        A list of dictionaries, where each dictionary contains file information:
+    list[FileRecord]
+        A list of records which store raw values and can be read like dictionaries
+        with the following keys:
         - name (str): File or directory name without the suffix.
         - suffix (str): File extension (empty for directories).
         - type (str): "file", "directory", "symlink", or "unknown".
@@ -92,61 +297,239 @@ def get_files_info():
         - creation_date (str): File creation date in "YYYY-MM-DD HH:MM:SS" format.
         - path (str): Absolute path to the file or directory.
     '''
-    files_paths = get_all_files_path_from_DD()
+    files_info = list(iter_files_info())
 
-    if not files_paths:
+    if not files_info:
         log.write_debug("Downloads directory doesn't contain any files")
 
-    files_info = []
-
-    for path in files_paths:
-        file_path = pathlib.Path(fr"{path}")
-
-        if file_path.exists():
-            if file_path.is_dir():
-                file_type = "directory"
-            elif file_path.is_file():
-                file_type = "file"
-            elif file_path.is_symlink():
-                file_type = "symlink"
-            else:
-                file_type = "unknown"
-
-            info = {
-                "name": file_path.name.removesuffix(file_path.suffix),
-                "suffix": file_path.suffix,
-                "type": file_type,               
-                "size": utils.format_bytes(file_path.stat().st_size),
-                "byte_size": file_path.stat().st_size,
-                "creation_date": datetime.fromtimestamp(file_path.stat().st_birthtime).strftime("%Y-%m-%d %H:%M:%S"),
-                "path": str(file_path.resolve())
-            }
-            files_info.append(info)
-
     return files_info
 
-def get_downloads_dictionary_stats():
+def get_downloads_aggregated_stats():
     '''
-    get_downloads_dictionary_stats _summary_
+    Computes size statistics of the "Downloads" folder per suffix and per file type.
+
+    The directory is streamed through `stats.aggregate`, so it is read once and no
+    list of all files is built.
 
     Returns
     -------
-    _type_
-        _description_
+    tuple[stats.GroupStats, dict[str, dict[str, stats.GroupStats]]] or None
+        Statistics of all files and the statistics grouped by "suffix" and by "type",
+        each with count, total, min, max and mean size. None if the directory doesn't
+        contain any files.
     '''
-    downloads_dictionary_files_info = get_files_info()
+    total, groups = stats.aggregate(iter_files_info(), keys=("suffix", "type"))
 
-    if not downloads_dictionary_files_info:
+    if not total.count:
         log.write_debug("Downloads directory doesn't contain any files info")
         return
 
-    total_files = len(downloads_dictionary_files_info)
+    return total, groups
+
+def get_downloads_dictionary_stats():
+    '''
+    Retrieves the number and size of files in the "Downloads" folder, also per suffix.
+
+    Returns
+    -------
+    tuple[int, dict[str, int], str, dict[str, str]] or None
+        A tuple containing:
+        - total_files (int): Number of visible files and directories.
+        - suffixes_count (dict): Number of files per suffix.
+        - total_size (str): Human-readable size of all files (e.g., "4.77 MB").
+        - size_per_suffix (dict): Human-readable size of files per suffix.
+
+        Returns None if the directory doesn't contain any files.
+    '''
+    aggregated_stats = get_downloads_aggregated_stats()
+
+    if aggregated_stats is None:
+        return
+
+    total, groups = aggregated_stats
+    suffix_groups = groups["suffix"]
+
+    suffixes_count = {suffix: group.count for suffix, group in suffix_groups.items()}
+    size_per_suffix = {suffix: utils.format_bytes(group.total_bytes) for suffix, group in suffix_groups.items()}
+
+    return total.count, suffixes_count, utils.format_bytes(total.total_bytes), size_per_suffix
+
+def refresh_downloads_index():
+    '''
+    Scans the "Downloads" folder and stores its files in the database index.
+
+    Files are streamed from the scan into the database in batches; files which
+    disappeared since the previous refresh are removed from the index.
+    Every file is written, so prefer `sync_downloads_index` for repeated refreshes.
+
+    Returns
+    -------
+    int or None
+        Number of indexed files, None if the directory has not been found or an error occurs.
+    '''
+    global _listing_index
+
+    download_dir_path = get_downloads_directory_real_path()
+
+    if download_dir_path is None:
+        return
+
+    index_sync.invalidate_snapshot(download_dir_path)
+
+    with _listing_index_lock:
+        _listing_index = None
+
+    return db_handler.replace_directory_files(download_dir_path, iter_files_info())
+
+def sync_downloads_index():
+    '''
+    Incrementally brings the database index of the "Downloads" folder up to date.
+
+    The folder is scanned and compared with the last snapshot by inode, modification time
+    and size; only added, changed and removed files are written to the database, in a
+    single transaction. On an unchanged folder nothing is written at all.
+
+    Returns
+    -------
+    index_sync.ScanDelta or None
+        The applied differences, None if the directory has not been found or an error occurs.
+    '''
+    download_dir_path = get_downloads_directory_real_path()
+
+    if download_dir_path is None:
+        return
+
+    # Records are created only for added and changed files
+    scanned = ((entry.path, file_record.get_signature(entry_stat), (entry, entry_stat))
+               for entry, entry_stat in scan_directory(download_dir_path))
+
+    delta = index_sync.sync_directory(download_dir_path, scanned, lambda item: create_file_record(*item))
+
+    with _listing_index_lock:
+        if delta and _listing_index is not None:
+            _listing_index.apply_delta(delta)
+
+    return delta
+
+def get_indexed_files_info(suffix: str=None,
+                           file_type: str=None,
+                           order_by: str="path",
+                           descending: bool=False,
+                           limit: int=None,
+                           offset: int=0):
+    '''
+    Returns files of the "Downloads" folder from the database index instead of reading the directory.
 
-    suffixes_count = dict(Counter(entry['suffix'] for entry in downloads_dictionary_files_info))
+    Call `refresh_downloads_index` first to bring the index up to date.
 
-    total_size = utils.format_bytes(sum(file["byte_size"] for file in downloads_dictionary_files_info))
-    size_per_suffix = dict(Counter(
-        {file['suffix']: utils.format_bytes(sum(f['byte_size'] for f in downloads_dictionary_files_info if f['suffix'] == file['suffix'])) for file in downloads_dictionary_files_info}
-        ))
+    Parameters
+    ----------
+    suffix : str, optional
+        Only files with this suffix are returned.
+    file_type : str, optional
+        Only files of this type ("file", "directory", ...) are returned.
+    order_by : str, optional
+        One of "path", "suffix", "type", "size", "mtime" or "birthtime".
+    descending : bool, optional
+        If True, files are returned in descending order.
+    limit : int, optional
+        Maximum number of files. All files if None.
+    offset : int, optional
+        Number of files to skip.
+
+    Returns
+    -------
+    list[FileRecord] or None
+        The indexed files, None if the directory has not been found or an error occurs.
+    '''
+    download_dir_path = get_downloads_directory_real_path()
+
+    if download_dir_path is None:
+        return
+
+    return db_handler.get_files(download_dir_path, suffix, file_type, order_by, descending, limit, offset)
+
+def get_listing_index():
+    '''
+    Returns the in-memory sorting and search indexes of the "Downloads" folder.
+
+    The indexes are built from the database index on the first call and then updated by
+    `sync_downloads_index` with the changes of every scan.
+
+    Returns
+    -------
+    file_listing.FileListingIndex or None
+        The indexes, None if the directory has not been found or an error occurs.
+    '''
+    global _listing_index
+
+    with _listing_index_lock:
+        if _listing_index is None:
+            records = get_indexed_files_info()
+
+            if records is None:
+                return
+
+            _listing_index = file_listing.FileListingIndex(records)
+
+        return _listing_index
+
+def query_indexed_files(search: str=None, order_by: str="name", descending: bool=False):
+    '''
+    Sorts and searches the indexed files of the "Downloads" folder.
+
+    Fast enough to be called on every keystroke (within a frame at 100k files), see
+    `file_listing.FileListingIndex`. The index is never built here, as that reads all
+    indexed files from the database; load it with `get_listing_index` first, e.g. in
+    a background task.
+
+    Parameters
+    ----------
+    search : str, optional
+        Text the file names must contain (case-insensitive). All files if empty.
+    order_by : str, optional
+        One of "name", "size", "date" or "suffix".
+    descending : bool, optional
+        If True, files are returned in descending order.
+
+    Returns
+    -------
+    file_listing.ListingResult or None
+        The matching files, read with `get_page`. None if the index has not been loaded
+        or an error occurs.
+    '''
+    try:
+        # Read without the lock, which is held while the index is being built
+        listing_index = _listing_index
+
+        if listing_index is None:
+            return
+
+        return listing_index.query(search, order_by, descending)
+    except Exception:
+        log.write_debug()
+        log.write_log("Error occured while searching files of Downloads directory")
+        return
+
+def get_indexed_aggregated_stats():
+    '''
+    Computes the statistics of `get_downloads_aggregated_stats` with queries on the database index.
+
+    Returns
+    -------
+    tuple[stats.GroupStats, dict[str, dict[str, stats.GroupStats]]] or None
+        Statistics of all indexed files and grouped by "suffix" and by "type".
+        None if the directory has not been found, the index is empty or an error occurs.
+    '''
+    download_dir_path = get_downloads_directory_real_path()
+
+    if download_dir_path is None:
+        return
+
+    aggregated_stats = db_handler.get_aggregated_stats(download_dir_path)
+
+    if aggregated_stats is None or not aggregated_stats[0].count:
+        log.write_debug("Downloads directory index doesn't contain any files info")
+        return
 
-    return total_files, suffixes_count, total_size, size_per_suffix
+    return aggregated_stats
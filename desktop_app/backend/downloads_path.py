@@ -0,0 +1,177 @@
+import os
+import sys
+import threading
+
+try:
+    import winreg
+except ImportError:  # Not on Windows
+    winreg = None
+
+from backend import log
+
+SHELL_FOLDERS_KEY = r"Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Shell Folders"
+DOWNLOADS_FOLDER_ID = "{374DE290-123F-4565-9164-39C4925E467B}"
+
+# Setting DOWNLOADMANAGER_DOWNLOADS_DIR uses the given directory instead of the system one.
+resolver_settings = {
+    "override": os.environ.get("DOWNLOADMANAGER_DOWNLOADS_DIR") or None,
+    "resolvers": None  # Resolvers of the current platform if None (see `get_platform_resolvers`)
+}
+
+_resolved = {"valid": False, "path": None}
+_resolved_lock = threading.Lock()
+
+def get_windows_downloads_path():
+    '''
+    Reads the path to the "Downloads" folder from the Windows Registry.
+
+    Returns
+    -------
+    str or None
+        The path, None if the registry is not available.
+    '''
+    if winreg is None:
+        return None
+
+    with winreg.OpenKey(winreg.HKEY_CURRENT_USER, SHELL_FOLDERS_KEY) as key:
+        downloads_path, _ = winreg.QueryValueEx(key, DOWNLOADS_FOLDER_ID)
+
+    return downloads_path
+
+def get_xdg_downloads_path():
+    '''
+    Reads the path to the "Downloads" folder from the XDG "user-dirs.dirs" file.
+
+    The file is looked up in $XDG_CONFIG_HOME (~/.config by default) and holds lines like
+    XDG_DOWNLOAD_DIR="$HOME/Downloads".
+
+    Returns
+    -------
+    str or None
+        The path, None if the file or the entry does not exist.
+    '''
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    user_dirs_path = os.path.join(config_home, "user-dirs.dirs")
+
+    if not os.path.isfile(user_dirs_path):
+        return None
+
+    with open(user_dirs_path, "r", encoding="utf-8") as file:
+        for line in file:
+            name, separator, value = line.strip().partition("=")
+
+            if name != "XDG_DOWNLOAD_DIR" or not separator:
+                continue
+
+            value = value.strip().strip('"')
+            if value.startswith("$HOME"):
+                value = os.path.expanduser("~") + value[len("$HOME"):]
+
+            # A path equal to the home directory means the folder is disabled
+            if os.path.isabs(value) and os.path.normpath(value) != os.path.normpath(os.path.expanduser("~")):
+                return value
+
+    return None
+
+def get_home_downloads_path():
+    '''
+    Returns the "Downloads" folder in the home directory, if it exists.
+
+    Returns
+    -------
+    str or None
+        The path, None if there is no such folder.
+    '''
+    downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+    return downloads_path if os.path.isdir(downloads_path) else None
+
+def get_platform_resolvers(platform: str=sys.platform):
+    '''
+    Returns the functions looking up the "Downloads" folder on a platform, in order.
+
+    Parameters
+    ----------
+    platform : str, optional
+        Value like `sys.platform`. The current platform by default.
+
+    Returns
+    -------
+    list[Callable[[], str or None]]
+        The resolvers.
+    '''
+    if platform == "win32":
+        return [get_windows_downloads_path, get_home_downloads_path]
+    if platform.startswith("linux") or platform.startswith("freebsd"):
+        return [get_xdg_downloads_path, get_home_downloads_path]
+
+    return [get_home_downloads_path]
+
+def configure(resolvers: list=None):
+    '''
+    Sets the functions looking up the "Downloads" folder and forgets the resolved path.
+
+    Parameters
+    ----------
+    resolvers : list[Callable[[], str or None]], optional
+        Functions tried in order until one returns a path. None for the resolvers of the
+        current platform.
+    '''
+    with _resolved_lock:
+        resolver_settings["resolvers"] = resolvers
+        _resolved["valid"] = False
+
+def set_override(path: str=None):
+    '''
+    Uses the given directory instead of the system "Downloads" folder.
+
+    Parameters
+    ----------
+    path : str, optional
+        The directory, e.g. picked by the user. None to go back to the system folder.
+    '''
+    with _resolved_lock:
+        resolver_settings["override"] = path
+        _resolved["valid"] = False
+
+def invalidate():
+    '''
+    Forgets the resolved path, so the next `get_downloads_path` looks it up again.
+    '''
+    with _resolved_lock:
+        _resolved["valid"] = False
+
+def _resolve():
+    if resolver_settings["override"]:
+        return resolver_settings["override"]
+
+    for resolver in resolver_settings["resolvers"] or get_platform_resolvers():
+        try:
+            downloads_path = resolver()
+        except Exception:
+            log.write_debug()
+            continue
+
+        if downloads_path:
+            return downloads_path
+
+    return None
+
+def get_downloads_path():
+    '''
+    Returns the path to the "Downloads" folder, looked up once until `invalidate`.
+
+    The override (see `set_override`) is used if set, otherwise the resolvers of the platform
+    are tried in order: the Windows Registry on Windows, the XDG "user-dirs.dirs" file on
+    Linux, and the "Downloads" folder in the home directory everywhere.
+
+    Returns
+    -------
+    str or None
+        The path, None if the folder has not been found.
+    '''
+    with _resolved_lock:
+        if not _resolved["valid"]:
+            _resolved["path"] = _resolve()
+            _resolved["valid"] = True
+
+        return _resolved["path"]
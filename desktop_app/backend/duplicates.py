@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from backend import downloads_dir
+from backend import hashing
+from backend import log
+
+HASH_WORKERS = os.cpu_count() or 1
+
+def _try_hash(hash_function, path: str):
+    try:
+        return hash_function(path)
+    except OSError:
+        return None
+
+def _try_hash_partial(path: str):
+    return _try_hash(hashing.hash_partial, path)
+
+def _try_hash_full(path: str):
+    return _try_hash(hashing.hash_file, path)
+
+def _group_by(records, get_key):
+    groups = {}
+
+    for record in records:
+        key = get_key(record)
+        if key is not None:
+            groups.setdefault(key, []).append(record)
+
+    return [group for group in groups.values() if len(group) > 1]
+
+def find_duplicates(records=None, min_size: int=1, use_processes: bool=True, max_workers: int=HASH_WORKERS):
+    '''
+    Finds groups of files with identical content.
+
+    Work is done in stages, each only for the files still possibly duplicated:
+
+    1. Files are grouped by size; files with a unique size are dropped without being read.
+    2. Hashes of the first and last 64 KB (`hashing.hash_partial`) split the size groups.
+    3. Files still sharing a partial hash (and larger than 128 KB) are hashed whole with
+       `hashing.hash_file`, in a process pool.
+
+    Hashes are cached in the database by inode, size and modification time (see
+    `hashing.get_cached_hashes`), so repeated searches read almost nothing.
+
+    Parameters
+    ----------
+    records : Iterable[FileRecord], optional
+        Files to check. Defaults to the files of the "Downloads" directory.
+    min_size : int, optional
+        Smaller files are ignored (empty files are all equal, but hardly duplicates).
+    use_processes : bool, optional
+        If True, full hashes are computed in a process pool, otherwise in a thread pool.
+    max_workers : int, optional
+        Number of processes or threads.
+
+    Returns
+    -------
+    list[list[FileRecord]] or None
+        Groups of identical files, the groups wasting the most space first. None if an error occurs.
+    '''
+    try:
+        if records is None:
+            records = downloads_dir.iter_files_info()
+
+        files = (record for record in records if record.type == "file" and record.byte_size >= min_size)
+        size_groups = _group_by(files, lambda record: record.byte_size)
+        candidates = [record for group in size_groups for record in group]
+
+        if not candidates:
+            return []
+
+        partial_hashes = {}
+        full_hashes = {}
+
+        for path, (partial_hash, full_hash) in hashing.get_cached_hashes(candidates).items():
+            if partial_hash is not None:
+                partial_hashes[path] = partial_hash
+            if full_hash is not None:
+                full_hashes[path] = full_hash
+
+        # Partial hashes read little data, so threads waiting on the disk are enough
+        missing = [record.path for record in candidates if record.path not in partial_hashes]
+        with ThreadPoolExecutor(max_workers=max(max_workers, 4)) as executor:
+            partial_hashes.update(zip(missing, executor.map(_try_hash_partial, missing)))
+
+        partial_groups = [group for size_group in size_groups
+                          for group in _group_by(size_group, lambda record: partial_hashes.get(record.path))]
+
+        # Small files have been read whole by the partial stage, their partial hash decides
+        content_hashes = dict(full_hashes)
+        for group in partial_groups:
+            if group[0].byte_size <= 2 * hashing.PARTIAL_HASH_BYTES:
+                content_hashes.update((record.path, partial_hashes[record.path]) for record in group)
+
+        missing = [record.path for group in partial_groups for record in group if record.path not in content_hashes]
+        if missing:
+            executor_class = ProcessPoolExecutor if use_processes and len(missing) > 1 else ThreadPoolExecutor
+            with executor_class(max_workers=max_workers) as executor:
+                full_hashes.update(zip(missing, executor.map(_try_hash_full, missing)))
+            content_hashes.update((path, full_hashes[path]) for path in missing)
+
+        hashing.store_hashes(candidates, partial_hashes, full_hashes)
+
+        duplicates = [group for partial_group in partial_groups
+                      for group in _group_by(partial_group, lambda record: content_hashes.get(record.path))]
+        duplicates.sort(key=lambda group: group[0].byte_size * (len(group) - 1), reverse=True)
+
+        log.write_log(f"Found {len(duplicates)} groups of duplicated files")
+
+        return duplicates
+    except Exception:
+        log.write_debug()
+        log.write_log("Error occured while searching for duplicated files")
+        return
@@ -0,0 +1,145 @@
+import os
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+
+from backend import utils
+
+class FileRecord(Mapping):
+    '''
+    Compact, read-only information about a single file or directory.
+
+    Only raw values are stored (in slots, without a per-object dictionary); the name is
+    derived from the path and the human-readable size and creation date are formatted
+    only when they are accessed. Suffixes are interned, so records of files with the same
+    extension share one string.
+
+    The record also behaves as a read-only dictionary with the keys of the former
+    `get_files_info` dictionaries, so `record["byte_size"]` and `dict(record)` keep working.
+
+    Parameters
+    ----------
+    path : str
+        Absolute path to the file or directory.
+    suffix : str
+        File extension (empty for directories).
+    file_type : str
+        "file", "directory", "symlink", or "unknown".
+    byte_size : int
+        Size in bytes (`st_size`).
+    birthtime : float
+        Creation time as a timestamp (`st_birthtime`).
+    mtime : float
+        Last modification time as a timestamp (`st_mtime`).
+    inode : int, optional
+        Inode number (`st_ino`), 0 where the system doesn't report it.
+    '''
+    __slots__ = ("path", "suffix", "type", "byte_size", "birthtime", "mtime", "inode")
+
+    KEYS = ("name", "suffix", "type", "size", "byte_size", "creation_date", "path")
+
+    def __init__(self, path: str, suffix: str, file_type: str, byte_size: int, birthtime: float, mtime: float, inode: int=0):
+        self.path = path
+        self.suffix = sys.intern(suffix)
+        self.type = file_type
+        self.byte_size = byte_size
+        self.birthtime = birthtime
+        self.mtime = mtime
+        self.inode = inode
+
+    @property
+    def name(self):
+        '''
+        File or directory name without the suffix.
+        '''
+        return os.path.basename(self.path).removesuffix(self.suffix)
+
+    @property
+    def size(self):
+        '''
+        Human-readable size (e.g., "4.77 MB").
+        '''
+        return utils.format_bytes(self.byte_size)
+
+    @property
+    def creation_date(self):
+        '''
+        Creation date in "YYYY-MM-DD HH:MM:SS" format.
+        '''
+        return datetime.fromtimestamp(self.birthtime).strftime("%Y-%m-%d %H:%M:%S")
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"FileRecord(path={self.path!r}, type={self.type!r}, byte_size={self.byte_size})"
+
+    def get_signature(self):
+        '''
+        Returns the values used to detect whether the file has changed between scans.
+
+        Returns
+        -------
+        tuple[int, float, int]
+            Inode, modification time and size in bytes.
+        '''
+        return self.inode, self.mtime, self.byte_size
+
+    def to_dict(self):
+        '''
+        Returns the record as a regular dictionary with formatted values.
+
+        Returns
+        -------
+        dict
+            Dictionary with the keys "name", "suffix", "type", "size", "byte_size",
+            "creation_date" and "path".
+        '''
+        return dict(self)
+
+def get_signature(entry_stat: os.stat_result):
+    '''
+    Returns the change signature of a file from its stat result, equal to `FileRecord.get_signature`.
+
+    Parameters
+    ----------
+    entry_stat : os.stat_result
+        The stat result of the file.
+
+    Returns
+    -------
+    tuple[int, float, int]
+        Inode, modification time and size in bytes.
+    '''
+    return entry_stat.st_ino, entry_stat.st_mtime, entry_stat.st_size
+
+def get_suffix(name: str):
+    '''
+    Returns the suffix of a file name, the same as `pathlib.PurePath(name).suffix`
+    without building a path object.
+
+    Parameters
+    ----------
+    name : str
+        The file name.
+
+    Returns
+    -------
+    str
+        The suffix including the dot, or an empty string.
+    '''
+    dot_index = name.rfind(".")
+
+    if 0 < dot_index < len(name) - 1:
+        return name[dot_index:]
+
+    return ""
@@ -0,0 +1,197 @@
+import hashlib
+import mmap
+import os
+
+from backend import db_handler
+from backend import downloads_dir
+from backend import log
+
+PARTIAL_HASH_BYTES = 64 * 1024       # Bytes hashed from the start and from the end of a file by `hash_partial`
+BUFFER_SIZE = 1024 * 1024            # Bytes read at once from files hashed with buffered reads
+MMAP_THRESHOLD = 8 * 1024 * 1024     # Files of at least this size are hashed through a memory map
+MMAP_SLICE_SIZE = 64 * 1024 * 1024   # Bytes of a memory map passed to the hash at once
+
+def _hash_buffered(file, digest):
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+
+    while read := file.readinto(buffer):
+        digest.update(view[:read])
+
+def _hash_mapped(file, byte_size: int, digest):
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+        for offset in range(0, byte_size, MMAP_SLICE_SIZE):
+            digest.update(view[offset:offset + MMAP_SLICE_SIZE])
+
+def hash_file(path: str):
+    '''
+    Hashes the whole content of a file with BLAKE2b.
+
+    Files of at least `MMAP_THRESHOLD` bytes are mapped into memory and hashed straight
+    from the page cache, without copying them into Python buffers. Smaller files, for which
+    setting up a map costs more than it saves, are read into one reused buffer.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+
+    Returns
+    -------
+    str
+        The digest in hexadecimal.
+    '''
+    digest = hashlib.blake2b()
+
+    with open(path, "rb", buffering=0) as file:
+        byte_size = os.fstat(file.fileno()).st_size
+
+        if byte_size >= MMAP_THRESHOLD:
+            try:
+                _hash_mapped(file, byte_size, digest)
+                return digest.hexdigest()
+            except (OSError, ValueError, OverflowError):
+                # E.g. a map larger than the address space of a 32-bit Python
+                digest = hashlib.blake2b()
+                file.seek(0)
+
+        _hash_buffered(file, digest)
+
+    return digest.hexdigest()
+
+def hash_partial(path: str):
+    '''
+    Hashes the first and the last `PARTIAL_HASH_BYTES` of a file.
+
+    Files which differ in their first or last bytes (almost all files of the same size
+    which are not duplicates) get different partial hashes after reading at most 128 KB.
+    Files up to 128 KB are hashed whole, so their partial hash is already conclusive.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+
+    Returns
+    -------
+    str
+        BLAKE2b digest in hexadecimal.
+    '''
+    digest = hashlib.blake2b(digest_size=20)
+
+    with open(path, "rb") as file:
+        digest.update(file.read(PARTIAL_HASH_BYTES))
+
+        byte_size = file.seek(0, os.SEEK_END)
+        if byte_size > PARTIAL_HASH_BYTES:
+            file.seek(max(PARTIAL_HASH_BYTES, byte_size - PARTIAL_HASH_BYTES))
+            digest.update(file.read(PARTIAL_HASH_BYTES))
+
+    return digest.hexdigest()
+
+def _get_signature(record):
+    # Scanned records have no inode number on Windows (`os.DirEntry.stat` leaves it at 0), while
+    # `downloads_dir.get_file_record` has it from `os.stat`; both must give the same signature
+    if record.inode:
+        return record.inode, record.byte_size, record.mtime
+
+    try:
+        file_stat = os.stat(record.path)
+    except OSError:
+        return record.inode, record.byte_size, record.mtime
+
+    return file_stat.st_ino, file_stat.st_size, file_stat.st_mtime
+
+def _get_cache_key(inode: int, size: int, mtime: float, path: str):
+    # Without an inode number (some file systems) the signature alone could match other files
+    return (inode, size, mtime) if inode else (inode, size, mtime, path)
+
+def get_cached_hashes(records):
+    '''
+    Returns stored hashes of files whose inode, size and modification time are unchanged.
+
+    Hashes are found by the file signature, not by the path, so a file keeps its hashes
+    when it is renamed or moved within the same drive.
+
+    Parameters
+    ----------
+    records : Iterable[FileRecord]
+        The files.
+
+    Returns
+    -------
+    dict[str, tuple[str, str]]
+        Partial and full hash (either may be None) by path, for the files with stored hashes.
+    '''
+    signatures = {record.path: _get_signature(record) for record in records}
+    rows = db_handler.get_file_hashes(signatures.values()) or []
+    stored = {}
+
+    for inode, size, mtime, path, partial_hash, full_hash in rows:
+        stored[_get_cache_key(inode, size, mtime, path)] = (partial_hash, full_hash)
+
+    hashes = {}
+
+    for path, signature in signatures.items():
+        values = stored.get(_get_cache_key(*signature, path))
+        if values is not None:
+            hashes[path] = values
+
+    return hashes
+
+def store_hashes(records, partial_hashes: dict, full_hashes: dict):
+    '''
+    Stores hashes of files with their signatures for `get_cached_hashes`.
+
+    Parameters
+    ----------
+    records : Iterable[FileRecord]
+        The files.
+    partial_hashes : dict[str, str]
+        Partial hashes by path.
+    full_hashes : dict[str, str]
+        Full hashes by path.
+
+    Returns
+    -------
+    bool
+        True if the hashes have been stored, False if an error occurs.
+    '''
+    return db_handler.save_file_hashes((*_get_signature(record), record.path, partial_hashes.get(record.path), full_hashes.get(record.path))
+                                       for record in records if partial_hashes.get(record.path) or full_hashes.get(record.path))
+
+def get_file_hash(path: str):
+    '''
+    Returns the full hash of a file, computed only if the file has changed since it was
+    last hashed.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+
+    Returns
+    -------
+    str or None
+        BLAKE2b digest of the file in hexadecimal, None if the file cannot be read.
+    '''
+    try:
+        record = downloads_dir.get_file_record(path)
+
+        if record is None:
+            return
+
+        partial_hash, full_hash = get_cached_hashes([record]).get(record.path, (None, None))
+
+        if full_hash is None:
+            full_hash = hash_file(record.path)
+            store_hashes([record], {record.path: partial_hash}, {record.path: full_hash})
+
+        return full_hash
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while hashing file '{path}'")
+        return
@@ -0,0 +1,137 @@
+import threading
+
+from backend import db_handler
+from backend import log
+
+class ScanDelta:
+    '''
+    Differences between a directory scan and the previous snapshot of the directory.
+
+    Attributes
+    ----------
+    added : list[FileRecord]
+        Files which weren't in the snapshot.
+    changed : list[FileRecord]
+        Files whose inode, modification time or size differs from the snapshot.
+    removed : list[str]
+        Paths of files from the snapshot which weren't found by the scan.
+    '''
+    __slots__ = ("added", "changed", "removed")
+
+    def __init__(self, added: list=None, changed: list=None, removed: list=None):
+        self.added = added or []
+        self.changed = changed or []
+        self.removed = removed or []
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self):
+        return f"ScanDelta(added={len(self.added)}, changed={len(self.changed)}, removed={len(self.removed)})"
+
+def compute_delta(scanned, snapshot: dict, create_record):
+    '''
+    Compares scanned files with a snapshot.
+
+    Only the signature (inode, modification time, size) of every file is compared, so
+    unchanged files cost one dictionary lookup each and records are created only for
+    added and changed files.
+
+    Parameters
+    ----------
+    scanned : Iterable[tuple[str, tuple[int, float, int], Any]]
+        Path, signature (see `file_record.get_signature`) and scan item of every file
+        of the current directory scan.
+    snapshot : dict[str, tuple[int, float, int]]
+        Signatures of the previously stored files by path.
+    create_record : Callable[[Any], FileRecord]
+        Creates the record of a file from its scan item.
+
+    Returns
+    -------
+    tuple[ScanDelta, dict[str, tuple[int, float, int]]]
+        The differences and the snapshot of the current scan.
+    '''
+    delta = ScanDelta()
+    new_snapshot = {}
+
+    for path, signature, item in scanned:
+        new_snapshot[path] = signature
+
+        previous_signature = snapshot.get(path)
+
+        if previous_signature is None:
+            delta.added.append(create_record(item))
+        elif previous_signature != signature:
+            delta.changed.append(create_record(item))
+
+    if len(new_snapshot) - len(delta.added) != len(snapshot):
+        delta.removed = [path for path in snapshot if path not in new_snapshot]
+
+    return delta, new_snapshot
+
+# Snapshots of synchronized directories, kept between syncs so only the first one reads the database
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+def sync_directory(directory_path: str, scanned, create_record):
+    '''
+    Brings the database index of a directory up to date with a scan of it.
+
+    The scan is compared with the previous snapshot of the directory and only the added,
+    changed and removed files are written to the database, in a single transaction.
+    The snapshot is read from the database on the first sync and kept in memory afterwards.
+
+    Parameters
+    ----------
+    directory_path : str
+        The scanned directory.
+    scanned : Iterable[tuple[str, tuple[int, float, int], Any]]
+        Path, signature and scan item of every file of the current scan (see `compute_delta`).
+    create_record : Callable[[Any], FileRecord]
+        Creates the record of a file from its scan item.
+
+    Returns
+    -------
+    ScanDelta or None
+        The applied differences, None if an error occurs.
+    '''
+    with _snapshots_lock:
+        snapshot = _snapshots.get(directory_path)
+
+        if snapshot is None:
+            snapshot = db_handler.get_snapshot(directory_path)
+
+        if snapshot is None:
+            return
+
+        delta, new_snapshot = compute_delta(scanned, snapshot, create_record)
+
+        if delta and not db_handler.apply_delta(directory_path, delta.added + delta.changed, delta.removed):
+            _snapshots.pop(directory_path, None)
+            return
+
+        _snapshots[directory_path] = new_snapshot
+
+    if delta:
+        log.write_log(f"Index of directory '{directory_path}' updated: {len(delta.added)} added, "
+                      f"{len(delta.changed)} changed, {len(delta.removed)} removed")
+
+    return delta
+
+def invalidate_snapshot(directory_path: str=None):
+    '''
+    Drops the in-memory snapshot, so the next sync reads it from the database again.
+
+    Call it after the database has been changed by other means (e.g. a full refresh).
+
+    Parameters
+    ----------
+    directory_path : str, optional
+        The directory whose snapshot should be dropped. All snapshots if None.
+    '''
+    with _snapshots_lock:
+        if directory_path is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(directory_path, None)
@@ -1,14 +1,367 @@
+import atexit
 import datetime
+import functools
+import gzip
+import itertools
+import json
 import os
+import re
+import shutil
+import queue
+import threading
+import time
 import traceback
 import inspect
 
+FLUSH_INTERVAL = 0.5    # Seconds the writer waits to gather more messages into one batch
+FLUSH_BATCH_SIZE = 256  # Maximum number of messages written with a single file append
+
+logs_directory_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs_files")
+
+# Log rotation settings, changed with `configure_rotation`
+rotation_settings = {
+    "max_bytes": 1024 * 1024,       # Active file size that triggers rotation (0 disables)
+    "max_age": 7 * 24 * 60 * 60,    # Age of the active file in seconds that triggers rotation (0 disables)
+    "backup_count": 5,              # Number of rotated generations kept next to the active file
+    "compress": False               # Gzip rotated generations
+}
+
+# Matches time stamps of text ("2025-03-02 17:30:19") and structured ("2025-03-02T17:30:19.123456") records
+TIME_STAMP_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})")
+
+# Structured log settings, changed with `configure_structured_log`
+structured_log_settings = {
+    "enabled": os.environ.get("DOWNLOADMANAGER_STRUCTURED_LOG", "0") == "1"
+}
+
+def configure_rotation(max_bytes: int=None, max_age: float=None, backup_count: int=None, compress: bool=None):
+    '''
+    Changes the rotation settings of the log files.
+
+    The active log file is rotated before a write when it is larger than `max_bytes`
+    or when its first entry is older than `max_age`. Rotated generations are named
+    "<file>.1" (newest) to "<file>.<backup_count>" (oldest), with a ".gz" suffix when
+    compressed; older generations are deleted.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Active file size in bytes that triggers rotation. 0 disables size-based rotation.
+    max_age : float, optional
+        Active file age in seconds that triggers rotation. 0 disables age-based rotation.
+    backup_count : int, optional
+        Number of rotated generations to keep. 0 discards the rotated file.
+    compress : bool, optional
+        If True, rotated generations are compressed with gzip.
+
+    Notes
+    -----
+    - Settings left as None keep their current values.
+    '''
+    new_settings = {
+        "max_bytes": max_bytes,
+        "max_age": max_age,
+        "backup_count": backup_count,
+        "compress": compress
+    }
+
+    with _writer.io_lock:
+        rotation_settings.update({key: value for key, value in new_settings.items() if value is not None})
+
+def get_rotated_files_paths(file_path: str):
+    '''
+    Returns paths of the existing rotated generations of a log file.
+
+    Parameters
+    ----------
+    file_path : str
+        The path to the active log file.
+
+    Returns
+    -------
+    list[str]
+        Paths of the rotated generations, from the newest to the oldest.
+    '''
+    directory_path, file_name = os.path.split(file_path)
+    pattern = re.compile(rf"{re.escape(file_name)}\.(\d+)(\.gz)?$")
+
+    generations = []
+
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            match = pattern.match(entry.name)
+            if match:
+                generations.append((int(match.group(1)), entry.path))
+
+    return [path for _, path in sorted(generations)]
+
+def _get_segment_start(file_path: str):
+    '''
+    Returns the time of the first entry of a log file as a timestamp.
+
+    Falls back to the current time if the file is empty or its first line has no time stamp.
+    '''
+    try:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as log_file:
+            match = TIME_STAMP_PATTERN.search(log_file.readline())
+    except FileNotFoundError:
+        return time.time()
+
+    if not match:
+        return time.time()
+
+    return datetime.datetime.strptime(f"{match.group(1)} {match.group(2)}", "%Y-%m-%d %H:%M:%S").timestamp()
+
+def remove_index_files(file_path: str):
+    '''
+    Removes the sidecar indexes of a log file (see `backend.log_index`), which don't match
+    its content anymore once it is cleared or rotated.
+
+    Parameters
+    ----------
+    file_path : str
+        The path to the log file.
+    '''
+    directory_path, file_name = os.path.split(file_path)
+    if not os.path.isdir(directory_path):
+        return
+
+    pattern = re.compile(rf"{re.escape(file_name)}(\.[A-Z]+)?\.idx$")
+
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            if pattern.match(entry.name):
+                os.remove(entry.path)
+
+def _rotate_file(file_path: str, backup_count: int, compress: bool):
+    '''
+    Shifts rotated generations of a log file by one and moves the active file to generation 1.
+    '''
+    remove_index_files(file_path)
+
+    for rotated_path in reversed(get_rotated_files_paths(file_path)):
+        generation, _, compressed = rotated_path[len(file_path) + 1:].partition(".")
+        generation = int(generation)
+
+        if generation >= backup_count:
+            os.remove(rotated_path)
+        else:
+            os.replace(rotated_path, f"{file_path}.{generation + 1}" + (".gz" if compressed else ""))
+
+    if backup_count <= 0:
+        os.remove(file_path)
+        return
+
+    if not compress:
+        os.replace(file_path, f"{file_path}.1")
+        return
+
+    with open(file_path, "rb") as source, gzip.open(f"{file_path}.1.gz", "wb") as target:
+        shutil.copyfileobj(source, target)
+    os.remove(file_path)
+
+class _BufferedLogWriter:
+    '''
+    Appends queued log messages to their files from a background thread.
+
+    Messages are collected into batches (up to `batch_size` messages or
+    `flush_interval` seconds, whichever comes first) and every batch is written
+    with one append per file, so a log call never touches the disk itself.
+    Log files are opened on their first write and kept open until they are
+    rotated or `close_files` is called.
+
+    Parameters
+    ----------
+    flush_interval : float
+        Time in seconds the writer waits for more messages before writing a batch.
+    batch_size : int
+        Maximum number of messages in one batch.
+    '''
+    def __init__(self, flush_interval: float=FLUSH_INTERVAL, batch_size: int=FLUSH_BATCH_SIZE):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.io_lock = threading.Lock() # Held while log files are being written
+        self._queue = queue.SimpleQueue()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._files = {}
+        self._segments_starts = {}
+
+    def submit(self, file_path: str, text: str):
+        '''
+        Queues text to be appended to the given file.
+
+        Parameters
+        ----------
+        file_path : str
+            The path to the log file.
+        text : str
+            The text to append, including its trailing newline.
+        '''
+        self._ensure_started()
+        self._queue.put((file_path, text))
+
+    def flush(self, timeout: float=None):
+        '''
+        Blocks until every message queued before the call has been written.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time in seconds to wait. Waits without limit if None.
+        '''
+        if self._thread is None or not self._thread.is_alive():
+            return
+
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close_files(self):
+        '''
+        Closes all open log files. Must be called with `io_lock` held.
+
+        Files are reopened on the next write.
+        '''
+        for log_file in self._files.values():
+            log_file.close()
+
+        self._files.clear()
+        self._segments_starts.clear()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            # A flush request ends the batch early, so the caller doesn't wait for the interval
+            while len(batch) < self.batch_size and not isinstance(batch[-1], threading.Event):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: list):
+        texts_per_file = {}
+        flush_requests = []
+
+        for item in batch:
+            if isinstance(item, threading.Event):
+                flush_requests.append(item)
+            else:
+                file_path, text = item
+                texts_per_file.setdefault(file_path, []).append(text)
+
+        try:
+            with self.io_lock:
+                for file_path, texts in texts_per_file.items():
+                    log_file = self._get_file(file_path)
+
+                    if self._needs_rotation(file_path, log_file.tell()):
+                        log_file.close()
+                        del self._files[file_path]
+                        _rotate_file(file_path, rotation_settings["backup_count"], rotation_settings["compress"])
+                        log_file = self._get_file(file_path)
+
+                    log_file.write("".join(texts).encode("utf-8"))
+                    log_file.flush()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            for done in flush_requests:
+                done.set()
+
+    def _get_file(self, file_path: str):
+        log_file = self._files.get(file_path)
+
+        if log_file is None:
+            log_file = open(file_path, "ab")
+            self._files[file_path] = log_file
+            self._segments_starts[file_path] = _get_segment_start(file_path) if log_file.tell() else time.time()
+
+        return log_file
+
+    def _needs_rotation(self, file_path: str, size: int):
+        max_bytes = rotation_settings["max_bytes"]
+        max_age = rotation_settings["max_age"]
+
+        if size == 0:
+            return False
+
+        too_big = max_bytes and size >= max_bytes
+        too_old = max_age and time.time() - self._segments_starts[file_path] >= max_age
+
+        return bool(too_big or too_old)
+
+    def shutdown(self):
+        '''
+        Writes pending messages and closes all open log files.
+        '''
+        self.flush()
+
+        with self.io_lock:
+            self.close_files()
+
+_writer = _BufferedLogWriter()
+atexit.register(_writer.shutdown)
+
+def flush_logs(timeout: float=None):
+    '''
+    Writes all pending log messages to their files.
+
+    Log messages are buffered and written in batches by a background thread.
+    Call this function when the files have to be up to date, e.g. before reading them.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Maximum time in seconds to wait. Waits without limit if None.
+    '''
+    _writer.flush(timeout)
+
+def set_logs_directory(directory_path: str):
+    '''
+    Changes the directory the log files are written to.
+
+    Pending messages are written to the current files first and the open files are closed.
+
+    Parameters
+    ----------
+    directory_path : str
+        The path to the new logs directory. Created if it doesn't exist.
+    '''
+    global logs_directory_path
+
+    flush_logs()
+
+    with _writer.io_lock:
+        _writer.close_files()
+        logs_directory_path = os.path.abspath(directory_path)
+        create_logs_files_paths.cache_clear()
+        get_structured_log_file_path.cache_clear()
+
+@functools.lru_cache(maxsize=1)
 def create_logs_files_paths():
     '''
     Creates and returns paths for log files.
 
-    This function ensures that a "logs_files" directory exists in the script's directory.
+    This function ensures that the logs directory (by default "logs_files" in the script's directory) exists.
     It then generates paths for two log files: "log.txt" and "debug_log.log".
+    The paths are resolved once and cached, so calling it for every message is cheap.
 
     Returns
     -------
@@ -17,14 +370,73 @@ def create_logs_files_paths():
         - log_file_path (str): The path to "log.txt".
         - debug_log_file_path (str): The path to "debug_log.log".
     '''
-    script_path = os.path.dirname(os.path.abspath(__file__))
-    dir_path = os.path.join(script_path, "logs_files")
-    os.makedirs(dir_path, exist_ok=True) # If directory "logs_files" doesn't exist inside "logs" directory, create one
-    log_file_path = os.path.join(dir_path, "log.txt")
-    debug_log_file_path = os.path.join(dir_path, "debug_log.log")
+    os.makedirs(logs_directory_path, exist_ok=True) # If directory "logs_files" doesn't exist inside "logs" directory, create one
+    log_file_path = os.path.join(logs_directory_path, "log.txt")
+    debug_log_file_path = os.path.join(logs_directory_path, "debug_log.log")
 
     return log_file_path, debug_log_file_path
 
+@functools.lru_cache(maxsize=1)
+def get_structured_log_file_path():
+    '''
+    Returns the path to the structured (JSON lines) log file "log.jsonl".
+
+    The file is written only when structured logging is enabled with `configure_structured_log`.
+
+    Returns
+    -------
+    str
+        The path to "log.jsonl" inside the logs directory.
+    '''
+    create_logs_files_paths() # Ensures the logs directory exists
+
+    return os.path.join(logs_directory_path, "log.jsonl")
+
+def configure_structured_log(enabled: bool):
+    '''
+    Turns the structured (JSON lines) log output on or off.
+
+    When enabled, every `write_log` and `write_debug` message is additionally appended to
+    "log.jsonl" as one JSON object per line with the fields "timestamp" (ISO 8601), "level",
+    "module", "function", "line" and "message". The file can be queried with
+    `backend.log_index.StructuredLogReader`. Setting DOWNLOADMANAGER_STRUCTURED_LOG=1
+    enables the output at startup.
+
+    Parameters
+    ----------
+    enabled : bool
+        True to write structured records, False to stop writing them.
+    '''
+    structured_log_settings["enabled"] = enabled
+
+def write_structured(level: str, message: str, caller: tuple=None, now: datetime.datetime=None):
+    '''
+    Queues one structured record for the JSON lines log file.
+
+    Parameters
+    ----------
+    level : str
+        Record level, e.g. "INFO" or "ERROR".
+    message : str
+        The log message.
+    caller : tuple[str, str, int], optional
+        (file name, function name, line number) of the code that logged the message.
+    now : datetime.datetime, optional
+        Time of the record. Current time if None.
+    '''
+    filename, func_name, lineno = caller or (None, None, None)
+    now = now or datetime.datetime.now()
+
+    record = {
+        "timestamp": now.isoformat(timespec="microseconds"),
+        "level": level,
+        "module": os.path.splitext(os.path.basename(filename))[0] if filename else None,
+        "function": func_name,
+        "line": lineno,
+        "message": message
+    }
+
+    _writer.submit(get_structured_log_file_path(), json.dumps(record, ensure_ascii=False) + "\n")
 
 def create_logs_files():
     '''
@@ -37,8 +449,7 @@ def create_logs_files():
     -----
     - Uses `open(file, "w").close()` to create an empty file without keeping it open.
     '''
-    log_file_path = create_logs_files_paths()[0] 
-    debug_log_file_path = create_logs_files_paths()[1] 
+    log_file_path, debug_log_file_path = create_logs_files_paths()
 
     if not os.path.exists(log_file_path):                       
         open(log_file_path, "w").close()
@@ -51,7 +462,9 @@ def clear_logs_files():
     Clears the contents of the log files without deleting them.
 
     This function retrieves the log file paths and truncates their contents to 0 bytes,
-    effectively clearing the logs while preserving the files.
+    effectively clearing the logs while preserving the files. Pending messages are
+    written first, so they don't reappear after clearing. Rotated generations of
+    the log files and indexes of the structured log are deleted.
 
     If a log file does not exist, it is ignored.
 
@@ -59,23 +472,39 @@ def clear_logs_files():
     -----
     - Uses `r+` mode to ensure the file is not recreated if it doesn’t exist.
     '''
-    log_file_path = create_logs_files_paths()[0]
-    debug_log_file_path = create_logs_files_paths()[1] 
+    log_file_path, debug_log_file_path = create_logs_files_paths()
+    structured_log_file_path = get_structured_log_file_path()
 
-    if os.path.exists(log_file_path):
-        with open(log_file_path, "r+") as log_file:
-            log_file.truncate(0)
+    flush_logs()
 
-    if os.path.exists(debug_log_file_path):
-        with open(debug_log_file_path, "r+") as debug_log_file:
-            debug_log_file.truncate(0)
+    with _writer.io_lock:
+        _writer.close_files()
+
+        if os.path.exists(log_file_path):
+            with open(log_file_path, "r+") as log_file:
+                log_file.truncate(0)
+
+        if os.path.exists(debug_log_file_path):
+            with open(debug_log_file_path, "r+") as debug_log_file:
+                debug_log_file.truncate(0)
+
+        if os.path.exists(structured_log_file_path):
+            with open(structured_log_file_path, "r+") as structured_log_file:
+                structured_log_file.truncate(0)
+
+        for file_path in (log_file_path, debug_log_file_path, structured_log_file_path):
+            for rotated_path in get_rotated_files_paths(file_path):
+                os.remove(rotated_path)
+
+        remove_index_files(structured_log_file_path)
 
 def write_log(message: str):
     '''
-    Writes a log message to the beginning of the log file.
+    Appends a log message to the end of the log file.
     
-    If the log file exists, the message is prepended to the file, ensuring the newest
-    logs appear first. A temporary file is used to avoid corruption during writing.
+    The message is queued and written by the background log writer together with
+    other pending messages, so the call costs no file I/O. Use `read_log` to get
+    the messages with the newest ones first.
     If the message is empty, the function does nothing.
 
     Parameters
@@ -83,65 +512,211 @@ def write_log(message: str):
     message : str
         The log message to be written.
     '''
-    log_file_path = create_logs_files_paths()[0]
-    temp_path = log_file_path + ".tmp"
-
-    if not os.path.exists(log_file_path):
-        return
-
     if message == '':
         return
 
-    time_stamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_file_path = create_logs_files_paths()[0]
+
+    now = datetime.datetime.now()
+    time_stamp = now.strftime("%Y-%m-%d %H:%M:%S")
     complete_message = f'[{time_stamp}]  {message}'
     
-    with open(temp_path, "w") as temp_file, open(log_file_path, "r") as log_file:
-        temp_file.write(complete_message + "\n")
-        for line in log_file:
-            temp_file.write(line)
-    os.replace(temp_path, log_file_path)
+    _writer.submit(log_file_path, complete_message + "\n")
+
+    if structured_log_settings["enabled"]:
+        callers = get_callers(depth=1) if caller_capture_settings["enabled"] else []
+        write_structured("INFO", message, callers[0] if callers else None, now)
 
     print(complete_message)
 
-def set_message_to_first_line(log_file_path: str, temp_path: str, error_message: str):
+def read_lines_reversed(file_path: str, chunk_size: int=8192):
     '''
-    Inserts an error message as the first line of a log file.
-    
-    If the log file exists, the message is written to a temporary file first,
-    followed by the original contents of the log file. The temporary file then
-    replaces the original log file. If the log file does not exist, it is created
-    and the message is written as its first line.
+    Yields the lines of a file starting from the last one.
+
+    The file is read backwards in chunks, so getting the newest entries of an
+    append-only log costs the same no matter how large the file is.
+    Empty lines are skipped.
 
     Parameters
     ----------
-    log_file_path : str
-        The path to the log file where the message should be inserted.
-    temp_path : str
-        A temporary file path used for writing before replacing the original log file.
-    error_message : str
-        The message to be inserted at the beginning of the log file.
+    file_path : str
+        The path to the file.
+    chunk_size : int, optional
+        Number of bytes read from the file at once.
+
+    Yields
+    ------
+    str
+        Lines of the file without the trailing newline, from the last to the first.
     '''
-    if os.path.exists(log_file_path):
-        with open(temp_path, "w") as temp_file, open(log_file_path, "r") as debug_log_file:
-            temp_file.write(error_message)
-            for line in debug_log_file:
-                temp_file.write(line)
+    with open(file_path, "rb") as file:
+        position = file.seek(0, os.SEEK_END)
+        remainder = b""
 
-        os.replace(temp_path, log_file_path)
-    else:
-        with open(log_file_path, "w") as debug_log_file:
-            debug_log_file.write(error_message)
+        while position > 0:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            file.seek(position)
 
-import datetime
-import inspect
-import traceback
+            lines = (file.read(read_size) + remainder).split(b"\n")
+            remainder = lines.pop(0) # May be the end of a line that starts in the previous chunk
+
+            for line in reversed(lines):
+                if line:
+                    yield line.decode("utf-8", errors="replace").rstrip("\r")
+
+        if remainder:
+            yield remainder.decode("utf-8", errors="replace").rstrip("\r")
+
+def read_records_reversed(file_path: str, chunk_size: int=8192):
+    '''
+    Yields multi-line debug records of a file starting from the last one.
+
+    A record starts with a header line (e.g. "ERROR [2025-03-02 17:30:19]") and
+    continues with tab-indented lines, as written by `write_debug`.
+
+    Parameters
+    ----------
+    file_path : str
+        The path to the file.
+    chunk_size : int, optional
+        Number of bytes read from the file at once.
+
+    Yields
+    ------
+    str
+        Complete records joined with newlines, from the newest to the oldest.
+    '''
+    record_lines = []
+
+    for line in read_lines_reversed(file_path, chunk_size):
+        record_lines.append(line)
+
+        if not line.startswith("\t"):
+            yield "\n".join(reversed(record_lines))
+            record_lines = []
+
+    if record_lines:
+        yield "\n".join(reversed(record_lines))
+
+def read_log(limit: int=None):
+    '''
+    Returns messages from the log file with the newest ones first.
+
+    Parameters
+    ----------
+    limit : int, optional
+        Maximum number of messages to return. Returns all messages if None.
+
+    Returns
+    -------
+    list[str]
+        Log messages, newest first. Empty if the log file doesn't exist.
+    '''
+    log_file_path = create_logs_files_paths()[0]
+
+    flush_logs()
+
+    if not os.path.exists(log_file_path):
+        return []
+
+    return list(itertools.islice(read_lines_reversed(log_file_path), limit))
+
+def read_debug_log(limit: int=None):
+    '''
+    Returns records from the debug log file with the newest ones first.
+
+    Parameters
+    ----------
+    limit : int, optional
+        Maximum number of records to return. Returns all records if None.
+
+    Returns
+    -------
+    list[str]
+        Debug records, newest first. Empty if the debug log file doesn't exist.
+    '''
+    debug_log_file_path = create_logs_files_paths()[1]
+
+    flush_logs()
+
+    if not os.path.exists(debug_log_file_path):
+        return []
+
+    return list(itertools.islice(read_records_reversed(debug_log_file_path), limit))
+
+# Caller capture settings of `write_debug`, changed with `configure_caller_capture`.
+# Setting DOWNLOADMANAGER_CAPTURE_CALLER=0 turns the capture off, e.g. in production builds.
+caller_capture_settings = {
+    "enabled": os.environ.get("DOWNLOADMANAGER_CAPTURE_CALLER", "1") != "0",
+    "depth": 1  # Number of frames above the caller listed in "Called from"
+}
+
+def configure_caller_capture(enabled: bool=None, depth: int=None):
+    '''
+    Changes how `write_debug` records where it was called from.
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        If False, debug messages are logged without file, function and line information.
+    depth : int, optional
+        Number of frames above the caller listed in the "Called from" section.
+
+    Notes
+    -----
+    - Settings left as None keep their current values.
+    '''
+    if enabled is not None:
+        caller_capture_settings["enabled"] = enabled
+
+    if depth is not None:
+        caller_capture_settings["depth"] = max(depth, 0)
+
+def get_callers(skip: int=1, depth: int=1):
+    '''
+    Returns file, function and line of the calling frames.
+
+    Frames are walked through `f_back` links, so no FrameInfo objects are built
+    and no source lines are read from disk.
+
+    Parameters
+    ----------
+    skip : int, optional
+        Number of frames above the frame calling this function to skip.
+    depth : int, optional
+        Number of frames to return after the skipped ones.
+
+    Returns
+    -------
+    list[tuple[str, str, int]]
+        (file name, function name, line number) of each frame, innermost first.
+        Shorter than `depth` if the stack isn't deep enough.
+    '''
+    frame = inspect.currentframe().f_back
+
+    for _ in range(skip):
+        if frame is None:
+            return []
+        frame = frame.f_back
+
+    callers = []
+
+    while frame is not None and len(callers) < depth:
+        callers.append((frame.f_code.co_filename, frame.f_code.co_name, frame.f_lineno))
+        frame = frame.f_back
+
+    del frame # Frame references create reference cycles
+
+    return callers
 
 def write_debug(message: str=""):
     '''
     Logs debug information, including function details and error messages.
 
-    This function writes debug logs to a dedicated debug log file. If a message is provided, 
-    it logs the function name, file name, line number, and the message itself. If no message 
+    This function appends debug logs to a dedicated debug log file. If a message is provided, 
+    it logs the function name, file name, line number, and the message itself, followed by the
+    frames it was called from (see `configure_caller_capture`). If no message 
     is provided, it logs details about the most recent exception, including traceback information.
 
     Parameters
@@ -149,44 +724,44 @@ def write_debug(message: str=""):
     message : str, optional
         Custom debug message to log. If empty, the function logs the most recent exception.
     '''
-    time_stamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    now = datetime.datetime.now()
+    time_stamp = now.strftime("%Y-%m-%d %H:%M:%S")
 
     debug_log_file_path = create_logs_files_paths()[1]
-    temp_path = debug_log_file_path + ".tmp"
 
     if message != "":
-        stack = inspect.stack()
-        
-        # Obecna funkcja, czyli `write_debug`
-        caller_frame = stack[1]  
-        filename = caller_frame.filename
-        func_name = caller_frame.function
-        lineno = caller_frame.lineno
-        
-        # Szukamy nadrzędnej linii (gdzie wywołano funkcję, np. przy tworzeniu obiektu klasy)
-        if len(stack) > 2:
-            parent_frame = stack[2]  
-            parent_filename = parent_frame.filename
-            parent_func_name = parent_frame.function
-            parent_lineno = parent_frame.lineno
+        callers = []
+
+        if not caller_capture_settings["enabled"]:
+            error_message = f"ERROR [{time_stamp}]\n\tMessage: {message}\n"
         else:
-            parent_filename = "N/A"
-            parent_func_name = "N/A"
-            parent_lineno = "N/A"
-
-        error_message = (
-            f"ERROR [{time_stamp}]\n"
-            f"\tFile: {filename}\n"
-            f"\tFunction: {func_name}\n"
-            f"\tLine: {lineno}\n"
-            f"\tMessage: {message}\n"
-            f"\tCalled from:\n"
-            f"\t\tFile: {parent_filename}\n"
-            f"\t\tFunction: {parent_func_name}\n"
-            f"\t\tLine: {parent_lineno}\n"
-        )
-
-        set_message_to_first_line(debug_log_file_path, temp_path, error_message)
+            depth = caller_capture_settings["depth"]
+            callers = get_callers(depth=depth + 1)
+            filename, func_name, lineno = callers[0]
+
+            # Frames above the caller (where it was called from, e.g. while creating an object of a class)
+            parents = callers[1:] or [("N/A", "N/A", "N/A")]
+
+            error_message = (
+                f"ERROR [{time_stamp}]\n"
+                f"\tFile: {filename}\n"
+                f"\tFunction: {func_name}\n"
+                f"\tLine: {lineno}\n"
+                f"\tMessage: {message}\n"
+            )
+
+            if depth:
+                error_message += "\tCalled from:\n" + "".join(
+                    f"\t\tFile: {parent_filename}\n"
+                    f"\t\tFunction: {parent_func_name}\n"
+                    f"\t\tLine: {parent_lineno}\n"
+                    for parent_filename, parent_func_name, parent_lineno in parents
+                )
+
+        _writer.submit(debug_log_file_path, error_message)
+
+        if structured_log_settings["enabled"]:
+            write_structured("ERROR", message, callers[0] if callers else None, now)
 
         print(error_message)
         
@@ -201,6 +776,9 @@ def write_debug(message: str=""):
     filename, lineno, func_name, text = tb[-1]
     error_message = f"ERROR [{time_stamp}]\n\tFunction name: {func_name}\n\tFunction file: {filename}\n\tLine number: {lineno}\n\tCode: {text}\n\tMessage: {exc_value}\n"
 
-    set_message_to_first_line(debug_log_file_path, temp_path, error_message)
+    _writer.submit(debug_log_file_path, error_message)
+
+    if structured_log_settings["enabled"]:
+        write_structured("ERROR", str(exc_value), (filename, func_name, lineno), now)
 
     print(error_message)
@@ -0,0 +1,294 @@
+import bisect
+import datetime
+import json
+import os
+import re
+import struct
+
+from backend import log
+
+INDEX_HEADER = struct.Struct("<8sQ")    # Magic, inode of the indexed log file
+INDEX_ENTRY = struct.Struct("<dQ")      # Record timestamp, record offset in the log file
+INDEX_MAGIC = b"DMLOGIDX"
+
+LEVEL_PATTERN = re.compile(r"^[A-Z]+$")
+
+class _IndexTimestamps:
+    '''
+    Read-only sequence of the timestamps stored in an index file.
+
+    Every item is read from the file on access, so `bisect` over it costs
+    O(log n) small reads instead of loading the whole index.
+    '''
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.length = (os.fstat(index_file.fileno()).st_size - INDEX_HEADER.size) // INDEX_ENTRY.size
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, position: int):
+        return read_index_entry(self.index_file, position)[0]
+
+def read_index_entry(index_file, position: int):
+    '''
+    Reads one entry of an index file.
+
+    Parameters
+    ----------
+    index_file : BinaryIO
+        Index file opened in binary mode.
+    position : int
+        Position of the entry.
+
+    Returns
+    -------
+    tuple[float, int]
+        Timestamp of the record and its offset in the log file.
+    '''
+    index_file.seek(INDEX_HEADER.size + position * INDEX_ENTRY.size)
+    return INDEX_ENTRY.unpack(index_file.read(INDEX_ENTRY.size))
+
+class StructuredLogReader:
+    '''
+    Reads the structured (JSON lines) log file through sidecar offset indexes.
+
+    The reader keeps one index file with an entry (timestamp, offset) for every record
+    ("log.jsonl.idx") and one for every level ("log.jsonl.ERROR.idx", ...). Records
+    are appended in time order, so a time range is found with a binary search over an
+    index and a page of records is read by seeking straight to their offsets.
+    Indexes are brought up to date on every query by indexing only the records
+    appended since the previous one, and are rebuilt when the log file is cleared
+    or rotated.
+
+    Parameters
+    ----------
+    file_path : str, optional
+        The path to the structured log file. Defaults to `log.get_structured_log_file_path()`.
+
+    Notes
+    -----
+    - Only one reader should update the indexes of a log file at a time.
+    '''
+    def __init__(self, file_path: str=None):
+        self.file_path = file_path or log.get_structured_log_file_path()
+
+    def get_index_file_path(self, level: str=None):
+        '''
+        Returns the path to the index file of all records or of one level.
+
+        Parameters
+        ----------
+        level : str, optional
+            Record level. The index of all records if None.
+
+        Returns
+        -------
+        str
+            The path to the index file.
+        '''
+        return f"{self.file_path}.{level}.idx" if level else f"{self.file_path}.idx"
+
+    def refresh(self):
+        '''
+        Writes pending log messages and indexes the records appended since the last refresh.
+        '''
+        log.flush_logs()
+
+        try:
+            log_stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            log.remove_index_files(self.file_path)
+            return
+
+        indexed_end = self._get_indexed_end(log_stat)
+
+        if indexed_end is None:
+            log.remove_index_files(self.file_path)
+            indexed_end = 0
+
+        if indexed_end >= log_stat.st_size:
+            return
+
+        new_entries = {}
+
+        with open(self.file_path, "rb") as log_file:
+            log_file.seek(indexed_end)
+            offset = indexed_end
+
+            for line in log_file:
+                if not line.endswith(b"\n"):
+                    break # The record is still being written
+
+                record_offset = offset
+                offset += len(line)
+
+                entry = self._parse_entry(line, record_offset)
+                if entry is None:
+                    continue
+
+                level, timestamp = entry
+                new_entries.setdefault(None, []).append((timestamp, record_offset))
+                if level:
+                    new_entries.setdefault(level, []).append((timestamp, record_offset))
+
+        for level, entries in new_entries.items():
+            self._append_entries(level, log_stat.st_ino, entries)
+
+    def count(self, start: datetime.datetime=None, end: datetime.datetime=None, level: str=None):
+        '''
+        Returns the number of records in a time range.
+
+        Parameters
+        ----------
+        start : datetime.datetime, optional
+            Earliest record time (inclusive). No lower bound if None.
+        end : datetime.datetime, optional
+            Latest record time (exclusive). No upper bound if None.
+        level : str, optional
+            Only records of this level are counted. All levels if None.
+
+        Returns
+        -------
+        int
+            Number of matching records.
+        '''
+        self.refresh()
+
+        index_file = self._open_index(level)
+        if index_file is None:
+            return 0
+
+        with index_file:
+            first, last = self._find_range(index_file, start, end)
+
+        return last - first
+
+    def read(self,
+             start: datetime.datetime=None,
+             end: datetime.datetime=None,
+             level: str=None,
+             offset: int=0,
+             limit: int=100,
+             newest_first: bool=True):
+        '''
+        Returns one page of records in a time range.
+
+        Parameters
+        ----------
+        start : datetime.datetime, optional
+            Earliest record time (inclusive). No lower bound if None.
+        end : datetime.datetime, optional
+            Latest record time (exclusive). No upper bound if None.
+        level : str, optional
+            Only records of this level are returned. All levels if None.
+        offset : int, optional
+            Number of matching records to skip.
+        limit : int, optional
+            Maximum number of records to return.
+        newest_first : bool, optional
+            If True, the page is counted from the newest record backwards.
+
+        Returns
+        -------
+        list[dict]
+            Records with the fields "timestamp", "level", "module", "function", "line" and "message".
+        '''
+        self.refresh()
+
+        index_file = self._open_index(level)
+        if index_file is None:
+            return []
+
+        with index_file:
+            first, last = self._find_range(index_file, start, end)
+
+            if newest_first:
+                positions = range(last - 1 - offset, max(last - 1 - offset - limit, first - 1), -1)
+            else:
+                positions = range(first + offset, min(first + offset + limit, last))
+
+            offsets = [read_index_entry(index_file, position)[1] for position in positions]
+
+        records = []
+
+        with open(self.file_path, "rb") as log_file:
+            for record_offset in offsets:
+                log_file.seek(record_offset)
+                records.append(json.loads(log_file.readline()))
+
+        return records
+
+    def _find_range(self, index_file, start: datetime.datetime, end: datetime.datetime):
+        timestamps = _IndexTimestamps(index_file)
+        first = bisect.bisect_left(timestamps, start.timestamp()) if start else 0
+        last = bisect.bisect_left(timestamps, end.timestamp()) if end else len(timestamps)
+
+        return first, max(first, last)
+
+    def _open_index(self, level: str):
+        try:
+            return open(self.get_index_file_path(level), "rb")
+        except FileNotFoundError:
+            return None
+
+    def _parse_entry(self, line: bytes, offset: int):
+        try:
+            record = json.loads(line)
+            timestamp = datetime.datetime.fromisoformat(record["timestamp"]).timestamp()
+        except (ValueError, KeyError, TypeError):
+            return None # Not logged, it would append another record to the file being indexed
+
+        level = record.get("level")
+        return (level if isinstance(level, str) and LEVEL_PATTERN.match(level) else None), timestamp
+
+    def _get_indexed_end(self, log_stat: os.stat_result):
+        '''
+        Returns the log file offset right after the last indexed record,
+        or None if the index doesn't match the log file anymore.
+        '''
+        index_file = self._open_index(None)
+        if index_file is None:
+            return 0
+
+        with index_file:
+            header = index_file.read(INDEX_HEADER.size)
+            if len(header) < INDEX_HEADER.size:
+                return None
+
+            magic, inode = INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC or inode != log_stat.st_ino:
+                return None
+
+            entries_count = len(_IndexTimestamps(index_file))
+            if entries_count == 0:
+                return 0
+
+            last_timestamp, last_offset = read_index_entry(index_file, entries_count - 1)
+
+        if last_offset >= log_stat.st_size:
+            return None # The log file has been truncated
+
+        # A file truncated in place (same inode) and written again can be longer than the
+        # indexed part, so the last indexed record must still be where the index says
+        with open(self.file_path, "rb") as log_file:
+            if last_offset > 0:
+                log_file.seek(last_offset - 1)
+                if log_file.read(1) != b"\n":
+                    return None
+
+            log_file.seek(last_offset)
+            entry = self._parse_entry(log_file.readline(), last_offset)
+            if entry is None or entry[1] != last_timestamp:
+                return None
+
+            return log_file.tell()
+
+    def _append_entries(self, level: str, inode: int, entries: list):
+        index_file_path = self.get_index_file_path(level)
+        is_new = not os.path.exists(index_file_path)
+
+        with open(index_file_path, "ab") as index_file:
+            if is_new:
+                index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, inode))
+            index_file.write(b"".join(INDEX_ENTRY.pack(timestamp, offset) for timestamp, offset in entries))
@@ -0,0 +1,278 @@
+import errno
+import os
+import shutil
+import stat
+import threading
+
+CHUNK_SIZE = 1024 * 1024                # Bytes copied per read/write (or zero-copy call) between progress reports
+ZERO_COPY_THRESHOLD = 4 * 1024 * 1024   # Smaller files are copied with buffered reads and writes
+
+class MoveCancelled(Exception):
+    '''
+    Raised when a move is cancelled through its cancel event.
+    '''
+
+class _Progress:
+    '''
+    Bytes copied so far out of the total, reported to an optional callback.
+    '''
+    def __init__(self, total_bytes: int, callback=None, cancel_event: threading.Event=None):
+        self.total_bytes = total_bytes
+        self.copied_bytes = 0
+        self.callback = callback
+        self.cancel_event = cancel_event
+
+    def advance(self, byte_count: int):
+        self.copied_bytes += byte_count
+
+        if self.callback is not None:
+            self.callback(self.copied_bytes, self.total_bytes)
+
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise MoveCancelled()
+
+def get_total_size(path: str):
+    '''
+    Returns the number of bytes a copy of a file or directory tree has to transfer.
+
+    Symbolic links are not followed and count as 0 bytes.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file or directory.
+
+    Returns
+    -------
+    int
+        Total size of the regular files in bytes.
+    '''
+    path_stat = os.lstat(path)
+
+    if not stat.S_ISDIR(path_stat.st_mode):
+        return path_stat.st_size if stat.S_ISREG(path_stat.st_mode) else 0
+
+    total_bytes = 0
+    stack = [path]
+
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total_bytes += entry.stat(follow_symlinks=False).st_size
+
+    return total_bytes
+
+def _copy_zero_copy(source_fd: int, destination_fd: int, byte_size: int, progress: _Progress):
+    '''
+    Copies a file inside the kernel with `os.copy_file_range`, or `os.sendfile` where the
+    former is missing or refused (e.g. across filesystems on older Linux kernels).
+
+    Returns False, before anything is written, if neither is supported for the two files.
+    A transfer function which stops returning data before the end of the file counts as
+    unsupported if it has copied nothing yet, otherwise the copy fails.
+    '''
+    transfer_functions = []
+    if hasattr(os, "copy_file_range"):
+        transfer_functions.append(lambda count: os.copy_file_range(source_fd, destination_fd, count))
+    if hasattr(os, "sendfile"):
+        transfer_functions.append(lambda count: os.sendfile(destination_fd, source_fd, None, count))
+
+    for transfer in transfer_functions:
+        copied = 0
+
+        try:
+            while copied < byte_size:
+                progress.check_cancelled()
+
+                sent = transfer(min(CHUNK_SIZE, byte_size - copied))
+                if sent == 0:
+                    break
+
+                copied += sent
+                progress.advance(sent)
+        except OSError as error:
+            if copied or error.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSOCK):
+                raise
+            continue
+
+        if copied == byte_size:
+            return True
+        if copied:
+            raise OSError(errno.EIO, f"Copy stopped after {copied} of {byte_size} bytes")
+
+    return False
+
+def _copy_chunked(source_file, destination_file, progress: _Progress):
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+
+    while True:
+        progress.check_cancelled()
+
+        read = source_file.readinto(buffer)
+        if not read:
+            break
+
+        destination_file.write(view[:read])
+        progress.advance(read)
+
+def copy_file(source_path: str, destination_path: str, progress: _Progress):
+    '''
+    Copies one file with its permissions and times, reporting progress and checking for
+    cancellation after every chunk.
+
+    Files of at least `ZERO_COPY_THRESHOLD` bytes are copied without passing the data
+    through user space where the system supports it; others, and every file where it
+    doesn't, are copied in chunks of `CHUNK_SIZE` bytes.
+
+    Parameters
+    ----------
+    source_path : str
+        The file to copy.
+    destination_path : str
+        The path of the copy. Must not exist.
+    progress : _Progress
+        Progress of the whole move.
+    '''
+    with open(source_path, "rb", buffering=0) as source_file, open(destination_path, "xb", buffering=0) as destination_file:
+        byte_size = os.fstat(source_file.fileno()).st_size
+        copied = False
+
+        if byte_size >= ZERO_COPY_THRESHOLD:
+            copied = _copy_zero_copy(source_file.fileno(), destination_file.fileno(), byte_size, progress)
+
+        if not copied:
+            _copy_chunked(source_file, destination_file, progress)
+
+        # The source is removed after the copy, so a short copy must not pass unnoticed
+        copied_size = os.fstat(destination_file.fileno()).st_size
+        if copied_size != byte_size:
+            raise OSError(errno.EIO, f"Copied {copied_size} of {byte_size} bytes", destination_path)
+
+    shutil.copystat(source_path, destination_path)
+
+def _copy_tree(source_path: str, destination_path: str, progress: _Progress):
+    if os.path.islink(source_path):
+        os.symlink(os.readlink(source_path), destination_path)
+        return
+
+    if not os.path.isdir(source_path):
+        copy_file(source_path, destination_path, progress)
+        return
+
+    os.mkdir(destination_path)
+
+    with os.scandir(source_path) as entries:
+        for entry in entries:
+            _copy_tree(entry.path, os.path.join(destination_path, entry.name), progress)
+
+    shutil.copystat(source_path, destination_path)
+
+def rename_no_replace(source_path: str, destination_path: str):
+    '''
+    Renames a file or directory without replacing a destination created by someone else
+    after the caller has checked that it is free.
+
+    On Windows `os.rename` never replaces the destination. On other systems a file is
+    hard-linked to the new name (which fails if the name is taken) and then unlinked from
+    the old one. Directories, and files on filesystems without hard links, are renamed with
+    `os.rename` after another check; there the destination may still appear in between,
+    but POSIX only lets a directory replace an empty directory.
+
+    Parameters
+    ----------
+    source_path : str
+        The file or directory to rename.
+    destination_path : str
+        The new path. Must not exist.
+
+    Raises
+    ------
+    FileExistsError
+        If the destination exists.
+    OSError
+        With errno EXDEV if the paths are on different filesystems.
+    '''
+    if os.name != "nt" and not (os.path.isdir(source_path) and not os.path.islink(source_path)):
+        try:
+            os.link(source_path, destination_path, follow_symlinks=False)
+        except OSError as error:
+            if error.errno not in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK):
+                raise
+        else:
+            os.unlink(source_path)
+            return
+
+    if os.path.lexists(destination_path):
+        raise FileExistsError(errno.EEXIST, "Destination already exists", destination_path)
+
+    os.rename(source_path, destination_path)
+
+def _remove(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+def move(source_path: str, destination_path: str, progress_callback=None, cancel_event: threading.Event=None):
+    '''
+    Moves a file or directory tree, choosing the fastest way the systems allow.
+
+    1. A rename (see `rename_no_replace`), instant on the same filesystem.
+    2. Across filesystems, large files are transferred by the kernel (`os.copy_file_range`
+       or `os.sendfile`) without copying the data through Python.
+    3. Everything else is copied in large chunks into a reused buffer.
+
+    The source is removed only after the whole copy has succeeded. If the copy fails or
+    is cancelled, the partial copy is removed and the source stays untouched.
+
+    Parameters
+    ----------
+    source_path : str
+        The file or directory to move.
+    destination_path : str
+        The new path. Must not exist.
+    progress_callback : Callable[[int, int], None], optional
+        Called with the copied and total bytes after every chunk (and once with the
+        total for a rename). Runs in the thread doing the move.
+    cancel_event : threading.Event, optional
+        Set it from another thread to cancel the move.
+
+    Raises
+    ------
+    FileExistsError
+        If the destination already exists.
+    MoveCancelled
+        If `cancel_event` has been set before the move has finished.
+    '''
+    if os.path.lexists(destination_path):
+        raise FileExistsError(errno.EEXIST, "Destination already exists", destination_path)
+
+    progress = _Progress(0, progress_callback, cancel_event)
+    progress.check_cancelled()
+
+    try:
+        rename_no_replace(source_path, destination_path)
+
+        if progress_callback is not None:
+            total_bytes = get_total_size(destination_path)
+            progress_callback(total_bytes, total_bytes)
+        return
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+
+    progress.total_bytes = get_total_size(source_path)
+
+    try:
+        _copy_tree(source_path, destination_path, progress)
+    except BaseException:
+        if os.path.lexists(destination_path):
+            _remove(destination_path)
+        raise
+
+    _remove(source_path)
@@ -0,0 +1,393 @@
+import fnmatch
+import json
+import os
+import re
+import time
+
+from backend import batch_operations
+from backend import downloads_dir
+from backend import log
+
+class Rule:
+    '''
+    A condition on downloaded files and the directory matching files are moved to.
+
+    Conditions which are not set match every file. A file matches the rule when it
+    matches all of its set conditions.
+
+    Parameters
+    ----------
+    name : str
+        Name of the rule, used in logs and reports.
+    target_directory : str
+        Directory matching files are moved to.
+    suffixes : list[str], optional
+        File extensions, e.g. [".pdf", ".docx"] (case insensitive).
+    name_pattern : str, optional
+        Glob pattern (e.g. "invoice_*") or, with `pattern_is_regex`, a regular expression
+        searched in the file name. Case insensitive.
+    pattern_is_regex : bool, optional
+        If True, `name_pattern` is a regular expression.
+    min_size : int, optional
+        Minimum file size in bytes.
+    max_size : int, optional
+        Maximum file size in bytes.
+    min_age : float, optional
+        Minimum time in seconds since the file was created.
+    max_age : float, optional
+        Maximum time in seconds since the file was created.
+    '''
+    __slots__ = ("name", "target_directory", "suffixes", "name_pattern", "pattern_is_regex",
+                 "min_size", "max_size", "min_age", "max_age", "regex")
+
+    def __init__(self,
+                 name: str,
+                 target_directory: str,
+                 suffixes: list=None,
+                 name_pattern: str=None,
+                 pattern_is_regex: bool=False,
+                 min_size: int=None,
+                 max_size: int=None,
+                 min_age: float=None,
+                 max_age: float=None):
+        self.name = name
+        self.target_directory = target_directory
+        self.suffixes = [suffix.lower() for suffix in suffixes] if suffixes else []
+        self.name_pattern = name_pattern
+        self.pattern_is_regex = pattern_is_regex
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_age = min_age
+        self.max_age = max_age
+        self.regex = re.compile(self.get_pattern_source(), re.IGNORECASE) if name_pattern else None
+
+    @classmethod
+    def from_dict(cls, rule_dict: dict):
+        '''
+        Creates a rule from a dictionary with the parameters of the constructor.
+
+        Parameters
+        ----------
+        rule_dict : dict
+            The rule parameters, e.g. loaded from JSON.
+
+        Returns
+        -------
+        Rule
+            The rule.
+        '''
+        return cls(**rule_dict)
+
+    def get_pattern_source(self):
+        '''
+        Returns the name pattern as a regular expression matched from the start of the name.
+
+        Returns
+        -------
+        str or None
+            The regular expression, None if the rule has no name pattern.
+        '''
+        if not self.name_pattern:
+            return None
+
+        if self.pattern_is_regex:
+            return f"(?s:.*?)(?:{self.name_pattern})"
+
+        return fnmatch.translate(self.name_pattern)
+
+    def matches_metadata(self, byte_size: int, age: float):
+        '''
+        Checks the size and age conditions of the rule.
+
+        Parameters
+        ----------
+        byte_size : int
+            File size in bytes.
+        age : float
+            Time in seconds since the file was created.
+
+        Returns
+        -------
+        bool
+            True if the file meets the size and age conditions.
+        '''
+        if self.min_size is not None and byte_size < self.min_size:
+            return False
+        if self.max_size is not None and byte_size > self.max_size:
+            return False
+        if self.min_age is not None and age < self.min_age:
+            return False
+        if self.max_age is not None and age > self.max_age:
+            return False
+        return True
+
+class RuleMatcher:
+    '''
+    Finds the first rule a file matches, using structures compiled once from the rules.
+
+    Rules are indexed by suffix in a hash map, so only the rules for the file's suffix
+    and the rules without suffixes are considered. Name patterns are combined into one
+    regular expression with a named group per rule; a single match of the file name
+    gives the first rule whose pattern matches, and later pattern rules are tested one
+    by one only when that rule fails its other conditions. Regular expressions with
+    capturing groups are always tested on their own, as numbered back references would
+    point at the wrong groups inside the combined expression.
+
+    Parameters
+    ----------
+    rules : list[Rule]
+        The rules in priority order (the first matching rule wins).
+    '''
+    def __init__(self, rules: list):
+        self.rules = list(rules)
+        self._candidates_per_suffix = {}
+        self._candidates_any_suffix = []
+
+        for index, rule in enumerate(self.rules):
+            if rule.suffixes:
+                for suffix in set(rule.suffixes):
+                    self._candidates_per_suffix.setdefault(suffix, []).append(index)
+            else:
+                self._candidates_any_suffix.append(index)
+
+        # Candidates for every suffix are merged with the rules without suffixes once, in priority order
+        self._candidates_per_suffix = {suffix: sorted(indexes + self._candidates_any_suffix)
+                                       for suffix, indexes in self._candidates_per_suffix.items()}
+
+        self._combined_pattern = None
+        self._combined_indexes = {index for index, rule in enumerate(self.rules)
+                                  if rule.regex is not None and not (rule.pattern_is_regex and rule.regex.groups)}
+        pattern_sources = [f"(?P<r{index}>{self.rules[index].get_pattern_source()})"
+                           for index in sorted(self._combined_indexes)]
+
+        if pattern_sources:
+            try:
+                self._combined_pattern = re.compile("|".join(pattern_sources), re.IGNORECASE)
+            except re.error:
+                # Patterns are then tested one by one
+                log.write_debug("Name patterns of the sorting rules cannot be combined")
+
+        if self._combined_pattern is None:
+            self._combined_indexes = set()
+
+    def match(self, name: str, suffix: str, byte_size: int, age: float):
+        '''
+        Returns the first rule matching a file.
+
+        Parameters
+        ----------
+        name : str
+            Full file name, including the suffix.
+        suffix : str
+            File extension.
+        byte_size : int
+            File size in bytes.
+        age : float
+            Time in seconds since the file was created.
+
+        Returns
+        -------
+        Rule or None
+            The first matching rule, None if no rule matches.
+        '''
+        candidates = self._candidates_per_suffix.get(suffix.lower(), self._candidates_any_suffix)
+        first_pattern_match = None
+
+        for index in candidates:
+            rule = self.rules[index]
+
+            if not rule.matches_metadata(byte_size, age):
+                continue
+
+            if rule.regex is None:
+                return rule
+
+            if index not in self._combined_indexes:
+                if rule.regex.match(name):
+                    return rule
+                continue
+
+            if first_pattern_match is None:
+                first_pattern_match = self._get_first_pattern_match(name)
+
+            if index < first_pattern_match:
+                continue
+            if index == first_pattern_match or rule.regex.match(name):
+                return rule
+
+        return None
+
+    def _get_first_pattern_match(self, name: str):
+        match = self._combined_pattern.match(name)
+        return int(match.lastgroup[1:]) if match else len(self.rules)
+
+class PlannedMove:
+    '''
+    A move of one file decided by a sorting rule.
+
+    Attributes
+    ----------
+    source : str
+        Current path of the file.
+    destination : str
+        Path of the file after the move.
+    rule_name : str
+        Name of the rule the file matched.
+    is_directory : bool
+        True if the entry is a directory.
+    '''
+    __slots__ = ("source", "destination", "rule_name", "is_directory")
+
+    def __init__(self, source: str, destination: str, rule_name: str, is_directory: bool=False):
+        self.source = source
+        self.destination = destination
+        self.rule_name = rule_name
+        self.is_directory = is_directory
+
+    def __repr__(self):
+        return f"PlannedMove({self.source!r} -> {self.destination!r}, rule={self.rule_name!r})"
+
+def load_rules(rules_file_path: str):
+    '''
+    Loads sorting rules from a JSON file containing a list of rule dictionaries.
+
+    Parameters
+    ----------
+    rules_file_path : str
+        The path to the JSON file.
+
+    Returns
+    -------
+    list[Rule] or None
+        The rules, None if the file cannot be read.
+    '''
+    try:
+        with open(rules_file_path, "r", encoding="utf-8") as rules_file:
+            return [Rule.from_dict(rule_dict) for rule_dict in json.load(rules_file)]
+    except Exception:
+        log.write_debug()
+        log.write_log(f"Error occured while loading sorting rules from '{rules_file_path}'")
+        return
+
+def plan_moves(records, matcher: RuleMatcher, now: float=None):
+    '''
+    Decides where files should be moved, without moving them.
+
+    Parameters
+    ----------
+    records : Iterable[FileRecord]
+        Files to sort, e.g. from `downloads_dir.iter_files_info`.
+    matcher : RuleMatcher
+        The compiled rules.
+    now : float, optional
+        Current time as a timestamp, used for the age conditions.
+
+    Returns
+    -------
+    list[PlannedMove]
+        Moves of the files matching a rule. Files already in their target directory are skipped.
+    '''
+    now = time.time() if now is None else now
+    plan = []
+
+    for record in records:
+        file_name = os.path.basename(record.path)
+        rule = matcher.match(file_name, record.suffix, record.byte_size, now - record.birthtime)
+
+        if rule is None:
+            continue
+
+        target_directory = os.path.abspath(rule.target_directory)
+        if os.path.dirname(record.path) == target_directory:
+            continue
+
+        plan.append(PlannedMove(record.path, os.path.join(target_directory, file_name), rule.name, record.type == "directory"))
+
+    return plan
+
+def apply_plan(plan: list, dry_run: bool=False):
+    '''
+    Moves files according to a plan, creating the target directories when needed.
+
+    The moves run as one batch (see `batch_operations.run_operations`), in parallel and
+    with a single log entry.
+
+    Parameters
+    ----------
+    plan : list[PlannedMove]
+        The moves, e.g. from `plan_moves`.
+    dry_run : bool, optional
+        If True, the planned moves are only logged.
+
+    Returns
+    -------
+    list[PlannedMove]
+        The moves which have been done (all planned moves in a dry run).
+    '''
+    if dry_run:
+        for move in plan:
+            log.write_log(f"[DRY RUN] '{move.source}' would be moved to '{move.destination}' (rule '{move.rule_name}')")
+        return list(plan)
+
+    operations = [batch_operations.Operation("move", move.source, move.destination) for move in plan]
+    results = batch_operations.run_operations(operations)
+
+    if results is None:
+        return []
+
+    return [move for move, result in zip(plan, results) if result.success]
+
+def sort_downloads(rules: list, dry_run: bool=False):
+    '''
+    Sorts the "Downloads" folder by the given rules.
+
+    Parameters
+    ----------
+    rules : list[Rule]
+        The rules in priority order.
+    dry_run : bool, optional
+        If True, the planned moves are only logged and returned.
+
+    Returns
+    -------
+    list[PlannedMove]
+        The moves which have been done (or planned, in a dry run).
+    '''
+    plan = plan_moves(downloads_dir.iter_files_info(), RuleMatcher(rules))
+
+    return apply_plan(plan, dry_run)
+
+class AutoSorter:
+    '''
+    Sorts new downloads as they arrive, as a subscriber of `watcher.DirectoryWatcher`.
+
+    Parameters
+    ----------
+    rules : list[Rule]
+        The rules in priority order, compiled once.
+    dry_run : bool, optional
+        If True, the planned moves are only logged.
+
+    Examples
+    --------
+    >>> directory_watcher = watcher.DirectoryWatcher()
+    >>> directory_watcher.subscribe(AutoSorter(load_rules("rules.json")))
+    >>> directory_watcher.start()
+    '''
+    def __init__(self, rules: list, dry_run: bool=False):
+        self.matcher = RuleMatcher(rules)
+        self.dry_run = dry_run
+
+    def __call__(self, events: list):
+        rescanned_directories = [event.path for event in events if event.kind == "rescan"]
+
+        if rescanned_directories:
+            # Changes have been lost, so every entry of the directory is planned again
+            records = [downloads_dir.create_file_record(entry, entry_stat)
+                       for directory_path in rescanned_directories
+                       for entry, entry_stat in downloads_dir.scan_directory(directory_path)]
+        else:
+            records = [downloads_dir.get_file_record(event.path) for event in events if event.kind in ("created", "modified")]
+            records = [record for record in records if record is not None]
+
+        return apply_plan(plan_moves(records, self.matcher), self.dry_run)
@@ -0,0 +1,148 @@
+from backend import utils
+
+class GroupStats:
+    '''
+    Running size statistics of one group of files (e.g. files with the same suffix).
+
+    Attributes
+    ----------
+    count : int
+        Number of files in the group.
+    total_bytes : int
+        Sum of the file sizes in bytes.
+    min_bytes : int or None
+        Size of the smallest file in bytes, None for an empty group.
+    max_bytes : int or None
+        Size of the largest file in bytes, None for an empty group.
+    '''
+    __slots__ = ("count", "total_bytes", "min_bytes", "max_bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_bytes = 0
+        self.min_bytes = None
+        self.max_bytes = None
+
+    @classmethod
+    def from_values(cls, count: int, total_bytes: int, min_bytes: int, max_bytes: int):
+        '''
+        Creates statistics from already aggregated values, e.g. from a database query.
+
+        Parameters
+        ----------
+        count : int
+            Number of files.
+        total_bytes : int
+            Sum of the file sizes in bytes.
+        min_bytes : int or None
+            Size of the smallest file in bytes.
+        max_bytes : int or None
+            Size of the largest file in bytes.
+
+        Returns
+        -------
+        GroupStats
+            The statistics.
+        '''
+        group = cls()
+        group.count = count
+        group.total_bytes = total_bytes
+        group.min_bytes = min_bytes
+        group.max_bytes = max_bytes
+        return group
+
+    def add(self, byte_size: int):
+        '''
+        Adds one file of the given size to the group.
+
+        Parameters
+        ----------
+        byte_size : int
+            The file size in bytes.
+        '''
+        self.count += 1
+        self.total_bytes += byte_size
+
+        if self.min_bytes is None or byte_size < self.min_bytes:
+            self.min_bytes = byte_size
+        if self.max_bytes is None or byte_size > self.max_bytes:
+            self.max_bytes = byte_size
+
+    @property
+    def mean_bytes(self):
+        '''
+        Mean file size in bytes, 0 for an empty group.
+        '''
+        return self.total_bytes / self.count if self.count else 0
+
+    def to_dict(self):
+        '''
+        Returns the raw statistics.
+
+        Returns
+        -------
+        dict
+            "count", "total_bytes", "min_bytes", "max_bytes" and "mean_bytes".
+        '''
+        return {
+            "count": self.count,
+            "total_bytes": self.total_bytes,
+            "min_bytes": self.min_bytes,
+            "max_bytes": self.max_bytes,
+            "mean_bytes": self.mean_bytes
+        }
+
+    def to_formatted_dict(self):
+        '''
+        Returns the statistics with human-readable sizes.
+
+        Returns
+        -------
+        dict
+            "count" and the sizes "total_size", "min_size", "max_size" and "mean_size" (e.g., "4.77 MB").
+        '''
+        return {
+            "count": self.count,
+            "total_size": utils.format_bytes(self.total_bytes),
+            "min_size": utils.format_bytes(self.min_bytes or 0),
+            "max_size": utils.format_bytes(self.max_bytes or 0),
+            "mean_size": utils.format_bytes(self.mean_bytes)
+        }
+
+def aggregate(records, keys: tuple=("suffix", "type")):
+    '''
+    Groups file records by one or more keys and computes size statistics in a single pass.
+
+    Every record is visited once and every group is updated in constant time, so the
+    cost grows linearly with the number of records.
+
+    Parameters
+    ----------
+    records : Iterable[FileRecord or dict]
+        Records with "byte_size" and the grouping keys, e.g. from `downloads_dir.iter_files_info`.
+    keys : tuple[str], optional
+        Names of the record fields to group by.
+
+    Returns
+    -------
+    tuple[GroupStats, dict[str, dict[str, GroupStats]]]
+        Statistics of all records and, for every key, the statistics of each of its values
+        (in order of first appearance).
+    '''
+    total = GroupStats()
+    groups = {key: {} for key in keys}
+
+    for record in records:
+        byte_size = record["byte_size"]
+        total.add(byte_size)
+
+        for key in keys:
+            key_groups = groups[key]
+            value = record[key]
+
+            group = key_groups.get(value)
+            if group is None:
+                group = key_groups[value] = GroupStats()
+            group.add(byte_size)
+
+    return total, groups
@@ -0,0 +1,206 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import log
+
+TASK_WORKERS = min(8, (os.cpu_count() or 1) + 4) # Background threads for scans and file operations
+POLL_INTERVAL_MS = 50                            # How often the UI thread collects finished tasks
+
+class TaskCancelled(Exception):
+    '''
+    Raised by `CancelToken.raise_if_cancelled` inside a task which has been cancelled.
+    '''
+
+class CancelToken:
+    '''
+    Cancellation flag shared by a background task and the code which started it.
+
+    The token can be passed as `cancel_event` to `move_engine.move` and the move functions
+    of `dir_operations`, which check `is_set` between chunks.
+
+    Attributes
+    ----------
+    group : str or None
+        Name of the group the task belongs to (e.g. the frame which started it).
+    '''
+    __slots__ = ("group", "_event")
+
+    def __init__(self, group: str=None):
+        self.group = group
+        self._event = threading.Event()
+
+    def cancel(self):
+        '''
+        Cancels the task. Its result will not be delivered.
+        '''
+        self._event.set()
+
+    def is_set(self):
+        '''
+        Returns True if the task has been cancelled.
+        '''
+        return self._event.is_set()
+
+    @property
+    def cancelled(self):
+        '''
+        True if the task has been cancelled.
+        '''
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        '''
+        Stops a long-running task at a convenient point if it has been cancelled.
+
+        Raises
+        ------
+        TaskCancelled
+            If the task has been cancelled.
+        '''
+        if self._event.is_set():
+            raise TaskCancelled()
+
+class TaskExecutor:
+    '''
+    Runs backend calls in background threads and hands their results back to the UI thread.
+
+    Tk widgets may only be used from the thread running the main loop, so callbacks are
+    not called by the worker threads. Finished tasks are put in a queue which the UI
+    thread empties with `process_results`, e.g. every `POLL_INTERVAL_MS` milliseconds
+    with `App.after`; callbacks of cancelled tasks are never called.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Maximum number of tasks running at the same time.
+    '''
+    def __init__(self, max_workers: int=TASK_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backend-task")
+        self._results = queue.SimpleQueue()
+        self._tokens = set()
+        self._tokens_lock = threading.Lock()
+
+    def submit(self, function, *args, on_done=None, on_error=None, group: str=None, pass_token: bool=False, **kwargs):
+        '''
+        Starts a function in a background thread.
+
+        Parameters
+        ----------
+        function : Callable
+            The backend function.
+        *args, **kwargs
+            Arguments of the function.
+        on_done : Callable[[Any], None], optional
+            Called on the UI thread with the return value of the function.
+        on_error : Callable[[Exception], None], optional
+            Called on the UI thread with the exception raised by the function. Errors
+            without a handler are written to the debug log.
+        group : str, optional
+            Name used to cancel related tasks together with `cancel_group`.
+        pass_token : bool, optional
+            If True, the token is passed to the function as the `cancel_token` keyword argument.
+
+        Returns
+        -------
+        CancelToken
+            Token cancelling the task.
+        '''
+        token = CancelToken(group)
+
+        if pass_token:
+            kwargs["cancel_token"] = token
+
+        with self._tokens_lock:
+            self._tokens.add(token)
+
+        self._executor.submit(self._run, token, function, args, kwargs, on_done, on_error)
+
+        return token
+
+    def _run(self, token: CancelToken, function, args: tuple, kwargs: dict, on_done, on_error):
+        if token.cancelled:
+            self._forget(token)
+            return
+
+        try:
+            result = function(*args, **kwargs)
+        except TaskCancelled:
+            self._forget(token)
+            return
+        except Exception as error:
+            self._results.put((token, on_error, error, True))
+            return
+
+        self._results.put((token, on_done, result, False))
+
+    def _forget(self, token: CancelToken):
+        with self._tokens_lock:
+            self._tokens.discard(token)
+
+    def process_results(self, max_results: int=100):
+        '''
+        Calls the callbacks of finished tasks. Call it only from the UI thread.
+
+        Parameters
+        ----------
+        max_results : int, optional
+            Maximum number of results handled in one call, so a burst of finished tasks
+            doesn't block the main loop.
+
+        Returns
+        -------
+        int
+            Number of results handled.
+        '''
+        handled = 0
+
+        while handled < max_results:
+            try:
+                token, callback, value, failed = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            handled += 1
+            self._forget(token)
+
+            if token.cancelled:
+                continue
+
+            try:
+                if callback is not None:
+                    callback(value)
+                elif failed:
+                    log.write_debug(f"Background task failed: {type(value).__name__}: {value}")
+            except Exception:
+                log.write_debug()
+
+        return handled
+
+    def cancel_group(self, group: str):
+        '''
+        Cancels all pending and running tasks of a group.
+
+        Parameters
+        ----------
+        group : str
+            The group name given to `submit`.
+        '''
+        with self._tokens_lock:
+            tokens = [token for token in self._tokens if token.group == group]
+
+        for token in tokens:
+            token.cancel()
+
+    def shutdown(self):
+        '''
+        Cancels all tasks and stops the worker threads without waiting for running tasks.
+        '''
+        with self._tokens_lock:
+            tokens = list(self._tokens)
+
+        for token in tokens:
+            token.cancel()
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
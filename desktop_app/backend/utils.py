@@ -1,3 +1,6 @@
+import itertools
+import os
+
 def format_bytes(size) -> str:
     '''
     Converts a file size in bytes to a human-readable format.
@@ -20,4 +23,43 @@ def format_bytes(size) -> str:
     for unit in units:
         if size < factor:
             return f"{size:.2f} {unit}"
-        size /= factor
\ No newline at end of file
+        size /= factor
+
+def batched(iterable, batch_size: int):
+    '''
+    Splits an iterable into lists of a given size.
+
+    Parameters
+    ----------
+    iterable : Iterable
+        The items to split.
+    batch_size : int
+        Maximum number of items in one batch.
+
+    Yields
+    ------
+    list
+        Consecutive items of the iterable. The last batch may be shorter.
+    '''
+    iterator = iter(iterable)
+
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+
+def get_creation_time(entry_stat: os.stat_result) -> float:
+    '''
+    Returns the creation time from a stat result.
+
+    Falls back to `st_ctime` on systems that don't report the birth time.
+
+    Parameters
+    ----------
+    entry_stat : os.stat_result
+        The stat result of a file or directory.
+
+    Returns
+    -------
+    float
+        The creation time as a timestamp.
+    '''
+    return getattr(entry_stat, "st_birthtime", entry_stat.st_ctime)
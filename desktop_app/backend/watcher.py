@@ -0,0 +1,466 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from backend import downloads_dir
+from backend import file_record
+from backend import log
+
+# Temporary files of downloads in progress (Chrome/Edge, Firefox, Safari, Opera, others)
+PARTIAL_DOWNLOAD_SUFFIXES = (".crdownload", ".part", ".partial", ".download", ".opdownload", ".tmp")
+
+DEBOUNCE_INTERVAL = 0.5 # Seconds without new events after which a batch is delivered
+MAX_BATCH_DELAY = 2.0   # Maximum seconds a batch is held back during a continuous burst
+POLL_INTERVAL = 1.0     # Seconds between directory scans of the polling backend
+
+# inotify event masks (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_EVENT = struct.Struct("iIII") # wd, mask, cookie, len
+
+class ChangeEvent:
+    '''
+    A change of one entry of the watched directory.
+
+    Attributes
+    ----------
+    kind : str
+        "created", "modified", "deleted", or "rescan" when changes have been lost and the
+        whole directory has to be scanned again.
+    path : str
+        Absolute path to the entry (the directory itself for "rescan").
+    '''
+    __slots__ = ("kind", "path")
+
+    def __init__(self, kind: str, path: str):
+        self.kind = kind
+        self.path = path
+
+    def __eq__(self, other):
+        return isinstance(other, ChangeEvent) and (self.kind, self.path) == (other.kind, other.path)
+
+    def __repr__(self):
+        return f"ChangeEvent(kind={self.kind!r}, path={self.path!r})"
+
+def is_partial_download(path: str):
+    '''
+    Checks if a path belongs to a download which is still in progress.
+
+    Parameters
+    ----------
+    path : str
+        The path to check.
+
+    Returns
+    -------
+    bool
+        True if the path has a temporary download suffix (e.g. ".crdownload" or ".part").
+    '''
+    return path.lower().endswith(PARTIAL_DOWNLOAD_SUFFIXES)
+
+def get_download_target(path: str):
+    '''
+    Returns the path a temporary download file is renamed to when the download finishes.
+
+    Parameters
+    ----------
+    path : str
+        The path of a temporary download file, e.g. "file.zip.part".
+
+    Returns
+    -------
+    str or None
+        The path without the temporary suffix, e.g. "file.zip". None if the path has no
+        temporary download suffix.
+    '''
+    if not is_partial_download(path):
+        return None
+
+    lowered_path = path.lower()
+    suffix = next(suffix for suffix in PARTIAL_DOWNLOAD_SUFFIXES if lowered_path.endswith(suffix))
+
+    return path[:-len(suffix)]
+
+def _has_partial_download(path: str):
+    return any(os.path.lexists(path + suffix) for suffix in PARTIAL_DOWNLOAD_SUFFIXES)
+
+def _merge_kind(previous_kind: str, kind: str):
+    if previous_kind is None:
+        return kind
+    elif previous_kind == "created":
+        return None if kind == "deleted" else "created"
+    elif previous_kind == "deleted":
+        return "modified" if kind == "created" else kind
+
+    return kind
+
+def coalesce_events(raw_events: list, held: dict=None):
+    '''
+    Merges raw events of a burst into at most one event per path.
+
+    Events of temporary download files are dropped, so renaming "file.zip.crdownload"
+    to "file.zip" results in a single "created" event for "file.zip". A file created
+    and deleted within the burst produces no event, a file created and then written
+    is reported as created, and a file deleted and created again as modified.
+
+    Events of a path are held back while a temporary download file of the same name
+    (e.g. "file.zip.part" for "file.zip") exists or has been created in the burst and not
+    removed. Firefox creates an empty placeholder "file.zip" next to "file.zip.part" and
+    renames the partial file onto it at the end, so "file.zip" is only reported once the
+    download has finished.
+
+    Parameters
+    ----------
+    raw_events : list[tuple[str, str]]
+        Kind ("created", "modified", "deleted" or "rescan") and path of raw events in order.
+    held : dict[str, str], optional
+        Events held back by the previous call, by path. They are merged before the raw
+        events, and the events held back by this call are stored in it.
+
+    Returns
+    -------
+    list[ChangeEvent]
+        The merged events, in order of the first event of each path.
+    '''
+    kinds = dict(held) if held else {}
+    partial_kinds = {}
+
+    if held is not None:
+        held.clear()
+
+    for kind, path in raw_events:
+        target_path = get_download_target(path)
+
+        if target_path is not None:
+            partial_kinds[target_path] = kind
+            continue
+
+        merged_kind = _merge_kind(kinds.get(path), kind)
+
+        if merged_kind is None:
+            del kinds[path]
+        else:
+            kinds[path] = merged_kind
+
+    events = []
+
+    for path, kind in kinds.items():
+        if kind != "rescan" and (partial_kinds.get(path) in ("created", "modified") or _has_partial_download(path)):
+            if held is not None:
+                held[path] = kind
+            continue
+
+        events.append(ChangeEvent(kind, path))
+
+    return events
+
+class _InotifyBackend:
+    '''
+    Reads changes of a directory from the Linux inotify interface.
+    '''
+    def __init__(self, directory_path: str):
+        self.directory_path = directory_path
+        self.removed = False
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+        if self._libc.inotify_add_watch(self._fd, os.fsencode(directory_path), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, f"inotify_add_watch failed for '{directory_path}'")
+
+    def read_events(self, timeout: float):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+
+        if not readable:
+            return []
+
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+
+        while offset < len(buffer):
+            _, mask, _, name_length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            name = buffer[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + name_length].rstrip(b"\0")
+            offset += INOTIFY_EVENT.size + name_length
+
+            if mask & IN_Q_OVERFLOW:
+                log.write_debug(f"Events of watched directory '{self.directory_path}' have been lost")
+                events.append(("rescan", self.directory_path))
+                continue
+
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self.removed = True
+                continue
+
+            name = os.fsdecode(name)
+            if not name or name.startswith("."): # Hidden entries are skipped like in `downloads_dir.scan_directory`
+                continue
+
+            path = os.path.join(self.directory_path, name)
+
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                events.append(("created", path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append(("deleted", path))
+            elif mask & IN_CLOSE_WRITE:
+                events.append(("modified", path))
+
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+class _PollingBackend:
+    '''
+    Detects changes of a directory by comparing periodic scans.
+
+    Only the entry signatures (inode, modification time, size) are kept between scans.
+    '''
+    def __init__(self, directory_path: str, poll_interval: float=POLL_INTERVAL):
+        self.directory_path = directory_path
+        self.poll_interval = poll_interval
+        self.removed = False
+        self._signatures = self._scan()
+        self._next_poll = time.monotonic() + poll_interval
+
+    def _scan(self):
+        try:
+            return {entry.path: file_record.get_signature(entry_stat)
+                    for entry, entry_stat in downloads_dir.scan_directory(self.directory_path)}
+        except OSError:
+            log.write_debug()
+            return {}
+
+    def read_events(self, timeout: float):
+        remaining = self._next_poll - time.monotonic()
+
+        if remaining > timeout:
+            time.sleep(timeout)
+            return []
+
+        time.sleep(max(remaining, 0))
+        self._next_poll = time.monotonic() + self.poll_interval
+
+        if not os.path.isdir(self.directory_path):
+            self.removed = True
+            return []
+
+        signatures = self._scan()
+        events = []
+
+        for path, signature in signatures.items():
+            previous_signature = self._signatures.get(path)
+
+            if previous_signature is None:
+                events.append(("created", path))
+            elif previous_signature != signature:
+                events.append(("modified", path))
+
+        events.extend(("deleted", path) for path in self._signatures if path not in signatures)
+
+        self._signatures = signatures
+        return events
+
+    def close(self):
+        pass
+
+class DirectoryWatcher:
+    '''
+    Watches a directory in a background thread and delivers batches of changes.
+
+    Uses inotify on Linux and falls back to polling on other systems or when inotify is
+    not available. Bursts of raw events are debounced (a batch is delivered after
+    `debounce_interval` seconds without new events, or at the latest `max_batch_delay`
+    seconds after its first event) and merged with `coalesce_events`.
+
+    When the kernel event queue overflows, the batch gets a "rescan" event and, for the
+    "Downloads" directory, the database index is brought up to date with
+    `downloads_dir.sync_downloads_index` before the batch is delivered. Events of files
+    with a download in progress are held back between batches until the download finishes.
+
+    When the watched directory is removed or moved, the pending changes are delivered and
+    the watcher stops; `start` can be called again once the directory exists.
+
+    Parameters
+    ----------
+    directory_path : str, optional
+        The directory to watch. Defaults to the "Downloads" directory.
+    debounce_interval : float, optional
+        Seconds without new events after which a batch is delivered.
+    max_batch_delay : float, optional
+        Maximum seconds a batch is held back during a continuous burst.
+    use_polling : bool, optional
+        If True, the polling backend is used even if inotify is available.
+
+    Notes
+    -----
+    - Callbacks are called from the watcher thread. UI code has to pass the events on
+      to the UI thread itself.
+    '''
+    def __init__(self,
+                 directory_path: str=None,
+                 debounce_interval: float=DEBOUNCE_INTERVAL,
+                 max_batch_delay: float=MAX_BATCH_DELAY,
+                 use_polling: bool=False):
+        self.directory_path = directory_path or downloads_dir.get_downloads_directory_real_path()
+        self.debounce_interval = debounce_interval
+        self.max_batch_delay = max_batch_delay
+        self.use_polling = use_polling
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        '''
+        Registers a function called with every delivered batch.
+
+        Parameters
+        ----------
+        callback : Callable[[list[ChangeEvent]], None]
+            Function receiving a list of changes.
+        '''
+        with self._callbacks_lock:
+            self._callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        '''
+        Removes a function registered with `subscribe`.
+
+        Parameters
+        ----------
+        callback : Callable[[list[ChangeEvent]], None]
+            The registered function.
+        '''
+        with self._callbacks_lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def start(self):
+        '''
+        Starts watching the directory. Does nothing if the watcher is already running.
+
+        Returns
+        -------
+        bool
+            True if the watcher is running, False if the directory cannot be watched.
+        '''
+        if self._thread is not None and self._thread.is_alive():
+            return True
+
+        if self.directory_path is None or not os.path.isdir(self.directory_path):
+            log.write_log(f"Directory '{self.directory_path}' cannot be watched, because it doesn't exist")
+            return False
+
+        backend = self._create_backend()
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(backend,), name="directory-watcher", daemon=True)
+        self._thread.start()
+
+        log.write_log(f"Watching directory '{self.directory_path}' for changes ({type(backend).__name__.strip('_')})")
+        return True
+
+    def stop(self, timeout: float=5.0):
+        '''
+        Stops watching the directory and waits for the watcher thread to finish.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time in seconds to wait for the thread.
+        '''
+        self._stop_event.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _create_backend(self):
+        if not self.use_polling and sys.platform.startswith("linux"):
+            try:
+                return _InotifyBackend(self.directory_path)
+            except (OSError, AttributeError):
+                log.write_debug("inotify is not available, falling back to polling")
+
+        return _PollingBackend(self.directory_path)
+
+    def _run(self, backend):
+        pending = []
+        held = {}
+        first_event_time = last_event_time = 0
+
+        try:
+            while not self._stop_event.is_set():
+                raw_events = backend.read_events(timeout=min(self.debounce_interval, 0.2))
+                now = time.monotonic()
+
+                if backend.removed:
+                    batch = coalesce_events(pending + raw_events)
+                    if batch:
+                        self._deliver(batch)
+                    log.write_log(f"Stopped watching directory '{self.directory_path}', because it has been removed or moved")
+                    break
+
+                if raw_events:
+                    if not pending:
+                        first_event_time = now
+                    pending.extend(raw_events)
+                    last_event_time = now
+
+                quiet = now - last_event_time >= self.debounce_interval
+                overdue = now - first_event_time >= self.max_batch_delay
+
+                if pending and (quiet or overdue):
+                    batch = coalesce_events(pending, held)
+                    pending = []
+                    if any(event.kind == "rescan" for event in batch):
+                        self._rescan()
+                    if batch:
+                        self._deliver(batch)
+        except Exception:
+            log.write_debug()
+            log.write_log(f"Error occured while watching directory '{self.directory_path}'")
+        finally:
+            backend.close()
+
+    def _rescan(self):
+        if self.directory_path != downloads_dir.get_downloads_directory_real_path():
+            return
+
+        if downloads_dir.sync_downloads_index() is None:
+            log.write_log(f"Directory '{self.directory_path}' could not be scanned again after lost changes")
+
+    def _deliver(self, batch: list):
+        with self._callbacks_lock:
+            callbacks = list(self._callbacks)
+
+        for callback in callbacks:
+            try:
+                callback(batch)
+            except Exception:
+                log.write_debug()
@@ -0,0 +1,106 @@
+'''
+Benchmark of `hashing.hash_file` on files from 1 KB to 4 GB.
+
+Compares buffered reads with the memory-mapped path used for large files and prints the
+throughput of both. Files are written to a temporary directory (up to the largest size,
+so make sure there is enough free space) and read once before measuring, so the numbers
+show hashing from the page cache rather than the speed of the disk.
+
+Run from the "desktop_app" directory:
+
+    python -m benchmarks.bench_hashing
+    python -m benchmarks.bench_hashing --max-size 256M
+'''
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from backend import hashing
+from backend import utils
+
+SIZES = [1024, 64 * 1024, 1024 ** 2, 16 * 1024 ** 2, 256 * 1024 ** 2, 1024 ** 3, 4 * 1024 ** 3]
+UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+def parse_size(text: str):
+    '''
+    Converts a size like "512", "64K", "256M" or "4G" to bytes.
+    '''
+    unit = text[-1].upper()
+    return int(text[:-1]) * UNITS[unit] if unit in UNITS else int(text)
+
+def create_file(directory: str, byte_size: int):
+    '''
+    Writes a file of random blocks and returns its path.
+    '''
+    path = os.path.join(directory, f"file_{byte_size}.bin")
+    block = os.urandom(min(byte_size, 1024 ** 2))
+
+    with open(path, "wb") as file:
+        for _ in range(byte_size // len(block)):
+            file.write(block)
+        file.write(block[:byte_size % len(block)])
+
+    return path
+
+def hash_buffered(path: str):
+    digest = hashlib.blake2b()
+
+    with open(path, "rb", buffering=0) as file:
+        hashing._hash_buffered(file, digest)
+
+    return digest.hexdigest()
+
+def hash_mapped(path: str):
+    digest = hashlib.blake2b()
+
+    with open(path, "rb", buffering=0) as file:
+        byte_size = os.fstat(file.fileno()).st_size
+        if byte_size:
+            hashing._hash_mapped(file, byte_size, digest)
+
+    return digest.hexdigest()
+
+def measure(function, path: str, byte_size: int):
+    '''
+    Returns the best throughput in MB/s of a few runs (at least about 0.2 s of work).
+    '''
+    repeats = max(3, min(1000, 200 * 1024 ** 2 // max(byte_size, 1)))
+    best = float("inf")
+
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            function(path)
+        best = min(best, (time.perf_counter() - start) / repeats)
+
+        if byte_size >= 1024 ** 3:
+            break
+
+    return byte_size / best / 1024 ** 2
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-size", default="4G", help="largest file size, e.g. 256M (default: 4G)")
+    arguments = parser.parse_args()
+
+    max_size = parse_size(arguments.max_size)
+
+    print(f"{'size':>10} {'buffered [MB/s]':>16} {'mmap [MB/s]':>12} {'hash_file [MB/s]':>17}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for byte_size in (size for size in SIZES if size <= max_size):
+            path = create_file(directory, byte_size)
+            hashing.hash_file(path) # Warms up the page cache
+
+            buffered = measure(hash_buffered, path, byte_size)
+            mapped = measure(hash_mapped, path, byte_size)
+            selected = measure(hashing.hash_file, path, byte_size)
+
+            print(f"{utils.format_bytes(byte_size):>10} {buffered:16.1f} {mapped:12.1f} {selected:17.1f}")
+
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+'''
+Benchmark of sorting and searching the Downloads listing with `file_listing.FileListingIndex`.
+
+Simulates typing queries into the search field of the Downloads view over synthetic
+records and prints the time of every keystroke (query and first page of 30 rows). Fails
+if a keystroke at 100k files takes longer than a frame (16 ms).
+
+Run from the "desktop_app" directory:
+
+    python -m benchmarks.bench_listing
+'''
+import random
+import time
+
+from backend import file_listing
+from backend.file_record import FileRecord, get_suffix
+
+WORDS = ["invoice", "report", "setup", "photo", "img", "scan", "document", "backup",
+         "final", "draft", "python", "installer", "video", "song", "archive"]
+SUFFIXES = [".pdf", ".zip", ".exe", ".jpg", ".iso", ".docx"]
+TYPED_QUERIES = ["invoice_s", "song1 (2)", "setup"]
+PAGE_SIZE = 30
+FRAME_BUDGET_MS = 16 # Maximum time of a keystroke at 100k files
+
+def create_records(count: int):
+    '''
+    Returns `count` synthetic file records with names like "invoice_scan1234 (1).pdf".
+    '''
+    generator = random.Random(count)
+    records = []
+
+    for i in range(count):
+        name = (f"{generator.choice(WORDS)}_{generator.choice(WORDS)}{generator.randint(0, 99999)} "
+                f"({generator.randint(0, 3)}){generator.choice(SUFFIXES)}")
+        records.append(FileRecord(path=f"/downloads/{i}/{name}",
+                                  suffix=get_suffix(name),
+                                  file_type="file",
+                                  byte_size=generator.randint(0, 4 * 1024 ** 3),
+                                  birthtime=1.7e9 + generator.random() * 1e7,
+                                  mtime=1.7e9))
+
+    return records
+
+def measure(listing_index, search: str, order_by: str, descending: bool):
+    start = time.perf_counter()
+    result = listing_index.query(search, order_by, descending)
+    result.get_page(0, PAGE_SIZE)
+    return (time.perf_counter() - start) * 1000, len(result)
+
+def main():
+    slow_keystrokes = []
+
+    for count in (10_000, 100_000):
+        records = create_records(count)
+
+        start = time.perf_counter()
+        listing_index = file_listing.FileListingIndex(records)
+        print(f"\n{count} files, indexes built in {time.perf_counter() - start:.2f} s")
+
+        for order_by in file_listing.SORT_COLUMNS:
+            elapsed, _ = measure(listing_index, None, order_by, True)
+            print(f"  sorted by {order_by:<7} {elapsed:8.2f} ms")
+
+        for query in TYPED_QUERIES:
+            print(f"  typing '{query}':")
+            for length in range(1, len(query) + 1):
+                elapsed, matches = measure(listing_index, query[:length], "size", False)
+                print(f"    {query[:length]!r:<14} {elapsed:8.2f} ms {matches:>8} matches")
+
+                if count == 100_000 and elapsed > FRAME_BUDGET_MS:
+                    slow_keystrokes.append(f"{query[:length]!r} ({elapsed:.2f} ms)")
+
+    assert not slow_keystrokes, f"Keystrokes over the {FRAME_BUDGET_MS} ms budget: {', '.join(slow_keystrokes)}"
+
+if __name__ == "__main__":
+    main()
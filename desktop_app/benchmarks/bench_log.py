@@ -0,0 +1,78 @@
+'''
+Micro-benchmark of `log.write_log` throughput.
+
+Compares the previous implementation, which resolved the log paths and rewrote the
+whole log file on every message, with the buffered writer that keeps its files open.
+
+Run from the "desktop_app" directory:
+
+    python -m benchmarks.bench_log [message_count]
+'''
+import contextlib
+import datetime
+import io
+import os
+import sys
+import tempfile
+import time
+
+from backend import log
+
+def legacy_write_log(logs_directory_path: str, message: str):
+    '''
+    Writes a log message the way `log.write_log` did before the buffered writer.
+    '''
+    os.makedirs(logs_directory_path, exist_ok=True)
+    log_file_path = os.path.join(os.path.abspath(logs_directory_path), "log.txt")
+    temp_path = log_file_path + ".tmp"
+
+    if not os.path.exists(log_file_path):
+        return
+
+    time_stamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    complete_message = f'[{time_stamp}]  {message}'
+
+    with open(temp_path, "w") as temp_file, open(log_file_path, "r") as log_file:
+        temp_file.write(complete_message + "\n")
+        for line in log_file:
+            temp_file.write(line)
+    os.replace(temp_path, log_file_path)
+
+    print(complete_message)
+
+def measure(write, message_count: int):
+    '''
+    Returns the number of messages per second written by `write`.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for i in range(message_count):
+            write(f"Directory 'file_{i}' has been moved to new localisation")
+        log.flush_logs()
+        elapsed = time.perf_counter() - start
+
+    return message_count / elapsed
+
+def main(message_count: int=2000):
+    with tempfile.TemporaryDirectory() as legacy_directory, tempfile.TemporaryDirectory() as directory:
+        open(os.path.join(legacy_directory, "log.txt"), "w").close()
+        legacy_rate = measure(lambda message: legacy_write_log(legacy_directory, message), message_count)
+
+        previous_directory_path = log.logs_directory_path
+        previous_rotation_settings = dict(log.rotation_settings)
+
+        try:
+            log.set_logs_directory(directory)
+            log.configure_rotation(max_bytes=0, max_age=0)
+            rate = measure(log.write_log, message_count)
+        finally:
+            log.configure_rotation(**previous_rotation_settings)
+            log.set_logs_directory(previous_directory_path)
+
+    print(f"messages:           {message_count}")
+    print(f"prepend (before):   {legacy_rate:12,.0f} msg/s")
+    print(f"buffered (after):   {rate:12,.0f} msg/s")
+    print(f"speed-up:           {rate / legacy_rate:12,.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,65 @@
+'''
+Benchmark of the per-suffix aggregation used by `get_downloads_dictionary_stats`.
+
+Compares the previous dict comprehension, which summed all files once for every file,
+with the single-pass `stats.aggregate` on synthetic records. The time per file of the
+single-pass version stays flat as the number of files grows.
+
+Run from the "desktop_app" directory:
+
+    python -m benchmarks.bench_stats
+'''
+import random
+import time
+from collections import Counter
+
+from backend import stats
+from backend import utils
+from backend.file_record import FileRecord
+
+SUFFIXES = [".pdf", ".zip", ".exe", ".png", ".jpg", ".mp4", ".iso", ".txt", ".docx", ""]
+
+def create_records(count: int):
+    '''
+    Returns `count` synthetic file records with random suffixes and sizes.
+    '''
+    generator = random.Random(count)
+    return [FileRecord(path=f"/downloads/file_{i}{suffix}",
+                       suffix=suffix,
+                       file_type="file" if suffix else "directory",
+                       byte_size=generator.randint(0, 4 * 1024 ** 3),
+                       birthtime=1.7e9 + i,
+                       mtime=1.7e9 + i)
+            for i, suffix in ((i, generator.choice(SUFFIXES)) for i in range(count))]
+
+def legacy_size_per_suffix(records: list):
+    '''
+    Computes the size per suffix the way `get_downloads_dictionary_stats` did before `stats.aggregate`.
+    '''
+    return dict(Counter(
+        {file['suffix']: utils.format_bytes(sum(f['byte_size'] for f in records if f['suffix'] == file['suffix'])) for file in records}
+        ))
+
+def single_pass_size_per_suffix(records: list):
+    _, groups = stats.aggregate(records, keys=("suffix", "type"))
+    return {suffix: utils.format_bytes(group.total_bytes) for suffix, group in groups["suffix"].items()}
+
+def measure(function, records: list):
+    start = time.perf_counter()
+    function(records)
+    return time.perf_counter() - start
+
+def main():
+    print(f"{'files':>8} {'before [s]':>12} {'after [s]':>12} {'after per file [us]':>20}")
+
+    for count in (1_000, 5_000, 10_000, 50_000, 100_000):
+        records = create_records(count)
+
+        # The quadratic version takes tens of seconds above 5k files
+        legacy = f"{measure(legacy_size_per_suffix, records):12.3f}" if count <= 5_000 else f"{'-':>12}"
+        single_pass = measure(single_pass_size_per_suffix, records)
+
+        print(f"{count:>8} {legacy} {single_pass:12.3f} {single_pass / count * 1e6:20.2f}")
+
+if __name__ == "__main__":
+    main()
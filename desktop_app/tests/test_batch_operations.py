@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from backend import batch_operations
+from backend import log
+from backend.batch_operations import Operation
+
+class ValidateOperationsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.logs_directory = log.logs_directory_path
+        log.set_logs_directory(self.path("logs"))
+
+        os.makedirs(os.path.join(self.root, "a", "sub"))
+        for name in ("file.txt", "other.txt"):
+            with open(os.path.join(self.root, name), "w") as file:
+                file.write(name)
+
+    def tearDown(self):
+        log.set_logs_directory(self.logs_directory)
+        self.directory.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def test_destination_inside_another_source_is_rejected(self):
+        operations = [
+            Operation("move", self.path("a"), self.path("b")),
+            Operation("move", self.path("file.txt"), self.path("a", "sub", "file.txt"))
+        ]
+
+        valid, rejected = batch_operations.validate_operations(operations)
+
+        self.assertEqual(valid, [0])
+        self.assertEqual(rejected[1].error, "destination is inside the source of another operation")
+
+    def test_destination_next_to_another_source_is_accepted(self):
+        operations = [
+            Operation("move", self.path("a", "sub"), self.path("sub")),
+            Operation("move", self.path("file.txt"), self.path("a", "file.txt"))
+        ]
+
+        valid, rejected = batch_operations.validate_operations(operations)
+
+        self.assertEqual(valid, [0, 1])
+        self.assertEqual(rejected, {})
+
+    def test_duplicate_operation_is_rejected_at_its_position(self):
+        operation = Operation("rename", self.path("other.txt"), "renamed.txt")
+
+        results = batch_operations.run_operations([operation, operation])
+
+        self.assertTrue(results[0].success)
+        self.assertFalse(results[1].success)
+        self.assertEqual(results[1].error, "source is used by another operation")
+        self.assertTrue(os.path.exists(self.path("renamed.txt")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from backend import db_handler
+
+class CreateSchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_path = os.path.join(self.directory.name, "database.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_connections_opened_at_once_migrate_once(self):
+        for _ in range(20):
+            if os.path.exists(self.database_path):
+                os.remove(self.database_path)
+
+            connections = [sqlite3.connect(self.database_path, timeout=30, check_same_thread=False) for _ in range(2)]
+            barrier = threading.Barrier(len(connections))
+            errors = []
+
+            def create_schema(connection):
+                barrier.wait()
+                try:
+                    db_handler.create_schema(connection)
+                except Exception as error:
+                    errors.append(error)
+
+            threads = [threading.Thread(target=create_schema, args=(connection,)) for connection in connections]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            try:
+                self.assertEqual(errors, [])
+                for connection in connections:
+                    self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], db_handler.SCHEMA_VERSION)
+            finally:
+                for connection in connections:
+                    connection.close()
+
+    def test_schema_is_upgraded_from_an_older_version(self):
+        with sqlite3.connect(self.database_path) as connection:
+            connection.executescript(db_handler.MIGRATIONS[1] + "PRAGMA user_version=1;")
+
+        connection = sqlite3.connect(self.database_path)
+        try:
+            db_handler.create_schema(connection)
+
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(files)")]
+            self.assertIn("inode", columns)
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], db_handler.SCHEMA_VERSION)
+        finally:
+            connection.close()
+
+if __name__ == "__main__":
+    unittest.main()
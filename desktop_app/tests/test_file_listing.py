@@ -0,0 +1,45 @@
+import os
+import unittest
+
+from backend import file_listing
+from backend.file_record import FileRecord, get_suffix
+from backend.index_sync import ScanDelta
+
+NAMES = ["Invoice_2024.pdf", "setup.exe", "photo (1).jpg", "report_final.docx", "a.zip", "IMG_0001.jpg"]
+QUERIES = ["i", "in", "inv", "invoice", "e", "ex", ".jpg", "(1)", "zzz", "p", "final"]
+
+def create_record(name: str, byte_size: int=0):
+    return FileRecord(path=f"/downloads/{name}",
+                      suffix=get_suffix(name),
+                      file_type="file",
+                      byte_size=byte_size,
+                      birthtime=0.0,
+                      mtime=0.0)
+
+def find_names(listing_index, search: str):
+    result = listing_index.query(search)
+    return [os.path.basename(record.path) for record in result.get_page(0, len(result))]
+
+class FileListingIndexTest(unittest.TestCase):
+    def assert_matches_scan(self, listing_index, names: list):
+        for query in QUERIES:
+            expected = sorted((name for name in names if query in name.casefold()), key=str.casefold)
+            self.assertEqual(find_names(listing_index, query), expected, query)
+
+    def test_short_and_long_queries_match_substrings(self):
+        listing_index = file_listing.FileListingIndex(create_record(name) for name in NAMES)
+
+        self.assert_matches_scan(listing_index, NAMES)
+
+    def test_postings_follow_deltas(self):
+        listing_index = file_listing.FileListingIndex(create_record(name) for name in NAMES)
+
+        listing_index.apply_delta(ScanDelta(added=[create_record("invoice_2025.pdf"), create_record("index.html")],
+                                            changed=[create_record("setup.exe", 10)],
+                                            removed=["/downloads/Invoice_2024.pdf", "/downloads/a.zip"]))
+
+        names = [name for name in NAMES if name not in ("Invoice_2024.pdf", "a.zip")] + ["invoice_2025.pdf", "index.html"]
+        self.assert_matches_scan(listing_index, names)
+
+if __name__ == "__main__":
+    unittest.main()
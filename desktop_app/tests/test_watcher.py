@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from backend import log
+from backend import sorting
+from backend import watcher
+from backend.watcher import ChangeEvent
+
+class WatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.logs_directory = log.logs_directory_path
+        log.set_logs_directory(os.path.join(self.root, ".logs"))
+
+    def tearDown(self):
+        log.set_logs_directory(self.logs_directory)
+        self.directory.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+class CoalesceEventsTest(WatcherTestCase):
+    def test_firefox_download_is_reported_once_the_partial_file_is_renamed(self):
+        target_path = self.path("x.zip")
+        partial_path = self.path("x.zip.part")
+        held = {}
+
+        started = watcher.coalesce_events([("created", target_path),
+                                           ("created", partial_path),
+                                           ("modified", partial_path)], held)
+        downloading = watcher.coalesce_events([("modified", partial_path)], held)
+        finished = watcher.coalesce_events([("deleted", partial_path),
+                                            ("created", target_path)], held)
+
+        self.assertEqual(started, [])
+        self.assertEqual(downloading, [])
+        self.assertEqual(finished, [ChangeEvent("created", target_path)])
+        self.assertEqual(held, {})
+
+    def test_firefox_download_with_removed_placeholder_is_reported_once(self):
+        target_path = self.path("x.zip")
+        partial_path = self.path("x.zip.part")
+        held = {}
+
+        started = watcher.coalesce_events([("created", target_path),
+                                           ("created", partial_path),
+                                           ("modified", partial_path)], held)
+        finished = watcher.coalesce_events([("deleted", target_path),
+                                            ("deleted", partial_path),
+                                            ("created", target_path)], held)
+
+        self.assertEqual(started, [])
+        self.assertEqual(finished, [ChangeEvent("created", target_path)])
+
+    def test_events_are_held_while_partial_file_exists(self):
+        target_path = self.path("x.zip")
+        held = {}
+
+        with open(target_path + ".part", "wb"):
+            pass
+
+        self.assertEqual(watcher.coalesce_events([("created", target_path)], held), [])
+        self.assertEqual(held, {target_path: "created"})
+
+        os.rename(target_path + ".part", target_path)
+
+        self.assertEqual(watcher.coalesce_events([("deleted", target_path + ".part")], held),
+                         [ChangeEvent("created", target_path)])
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is only available on Linux")
+class DirectoryWatcherTest(WatcherTestCase):
+    def test_watcher_stops_when_directory_is_removed(self):
+        watched_path = self.path("watched")
+        os.mkdir(watched_path)
+        batches = []
+
+        directory_watcher = watcher.DirectoryWatcher(watched_path, debounce_interval=0.05)
+        directory_watcher.subscribe(batches.append)
+        self.assertTrue(directory_watcher.start())
+
+        os.rmdir(watched_path)
+
+        thread = directory_watcher._thread
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        directory_watcher.stop()
+
+class AutoSorterTest(WatcherTestCase):
+    def test_rescan_plans_the_whole_directory(self):
+        for name in ("a.pdf", "b.pdf", "c.txt"):
+            with open(self.path(name), "wb"):
+                pass
+
+        sorter = sorting.AutoSorter([sorting.Rule("documents", self.path("documents"), suffixes=[".pdf"])], dry_run=True)
+        plan = sorter([ChangeEvent("rescan", self.root)])
+
+        self.assertEqual(sorted(move.source for move in plan), [self.path("a.pdf"), self.path("b.pdf")])
+
+if __name__ == "__main__":
+    unittest.main()